@@ -0,0 +1,99 @@
+"""
+Benchmarks of the pack generation against the in-memory database of fixtures.py.
+Each benchmark checks the number of database calls against a budget and reports its packs per second.
+
+Run with: python -m pytest benchmarks
+"""
+# Standard imports
+import json
+import pickle
+
+# Pypi imports
+import numpy
+from click.testing import CliRunner
+
+# Local imports
+from gamemodes.chaos import choose_set
+from models.booster import create_booster
+from models.prerelease import create_prerelease
+from mtglimited import run
+
+# Packs of an 8 player draft with 3 boosters each
+PLAYERS = 8
+BOOSTERS = 3
+
+def test_create_booster(bench):
+    rng = numpy.random.default_rng(0)
+    result = bench('create_booster', lambda: list(create_booster('PLN', PLAYERS * BOOSTERS, rng)), PLAYERS * BOOSTERS)
+    # The booster document and the names of its cards
+    assert result['calls'] <= 2
+
+def test_create_booster_balanced(bench):
+    rng = numpy.random.default_rng(0)
+    result = bench('create_booster balanced', lambda: list(create_booster('BAL', PLAYERS * BOOSTERS, rng)), PLAYERS * BOOSTERS)
+    # The booster document and its cards, whose colors are also used to build the balanced sheets
+    assert result['calls'] <= 2
+
+def test_create_prerelease(bench):
+    rng = numpy.random.default_rng(0)
+    result = bench('create_prerelease', lambda: list(create_prerelease('PRE', PLAYERS, rng)), PLAYERS)
+    assert result['calls'] <= 2
+
+def test_packs_pickle(cold):
+    packs = create_booster('PLN', PLAYERS * BOOSTERS, numpy.random.default_rng(0))
+    restored = pickle.loads(pickle.dumps(packs))
+    # Only the matrices travel between processes, the booster being found again in the cache
+    assert restored.booster is packs.booster
+    assert list(restored) == list(packs)
+    assert len(pickle.dumps(packs)) < packs.cards.nbytes + packs.slots.nbytes + 1024
+
+def test_chaos_selection(bench):
+    rng = numpy.random.default_rng(0)
+    result = bench('chaos selection', lambda: choose_set(BOOSTERS, False, rng), BOOSTERS)
+    # The legal sets are read once, then cached
+    assert result['calls'] <= 1
+
+def command(bench, tmp_path, monkeypatch, name: str, arguments: list[str], packs: int) -> dict:
+    """
+    Run a full command of the CLI, writing its output to a temporary directory.
+    """
+    monkeypatch.delenv('MTGLIMITED_SNAPSHOT', raising=False)
+    runner = CliRunner()
+
+    def invoke() -> None:
+        result = runner.invoke(run, arguments + ['-o', str(tmp_path)])
+        assert result.exit_code == 0, result.output
+
+    return bench(name, invoke, packs, rounds=3)
+
+def test_limited_command(bench, tmp_path, monkeypatch):
+    result = command(bench, tmp_path, monkeypatch, 'limited command', ['limited', 'PLN', '--player', str(PLAYERS), '--number', str(BOOSTERS)], PLAYERS * BOOSTERS)
+    assert result['calls'] <= 2
+
+def test_prerelease_command(bench, tmp_path, monkeypatch):
+    # Each player opens 6 boosters and a prerelease pack
+    result = command(bench, tmp_path, monkeypatch, 'prerelease command', ['prerelease', 'PRE', '--player', str(PLAYERS)], PLAYERS * 7)
+    assert result['calls'] <= 4
+
+def test_chaos_command(bench, tmp_path, monkeypatch):
+    result = command(bench, tmp_path, monkeypatch, 'chaos command', ['chaos', str(BOOSTERS), '--player', str(PLAYERS)], PLAYERS * BOOSTERS)
+    # The legal sets, the boosters of every chosen set and their cards are each read with one query
+    assert result['calls'] <= 3
+
+def test_limited_command_jsonl(bench, tmp_path, monkeypatch):
+    result = command(bench, tmp_path, monkeypatch, 'limited command jsonl', ['limited', 'PLN', '--player', str(PLAYERS), '--number', str(BOOSTERS), '--format', 'jsonl'], PLAYERS * BOOSTERS)
+    # Only the booster document is read, the records holding uuids rather than names
+    assert result['calls'] <= 1
+
+def test_prerelease_command_jsonl(cold, tmp_path, monkeypatch):
+    monkeypatch.delenv('MTGLIMITED_SNAPSHOT', raising=False)
+    result = CliRunner().invoke(run, ['prerelease', 'PRE', '--format', 'jsonl', '-o', str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    # The 6 boosters of the player are followed by the prerelease pack, told apart by their kind
+    with open(tmp_path / 'packs.jsonl') as f:
+        assert [json.loads(line)['kind'] for line in f] == ['booster'] * 6 + ['prerelease']
+
+def test_conflicting_output_options(cold, tmp_path):
+    for options in (['--format', 'jsonl', '--online-limited'], ['--names']):
+        result = CliRunner().invoke(run, ['limited', 'PLN', '-o', str(tmp_path)] + options)
+        assert result.exit_code == 2
@@ -0,0 +1,32 @@
+"""
+Checks of the incremental JSON reader on documents cut at chosen places.
+
+Run with: python -m pytest benchmarks
+"""
+# Local imports
+from utils.jsonstream import JSONStream
+
+class ChunkedFile:
+    """
+    File returning the given chunks one per read, whatever the size asked for.
+    """
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = list(chunks)
+
+    def read(self, size: int = -1) -> str:
+        return self.chunks.pop(0) if self.chunks else ''
+
+def read_object(chunks: list[str]) -> dict:
+    stream = JSONStream(ChunkedFile(chunks))  # type: ignore[arg-type]
+    return {key: stream.read_value() for key in stream.iter_object()}
+
+def test_numbers_cut_between_chunks():
+    document = '{"manaValue": 3.0, "saltiness": 2.5e3, "power": -1.25, "count": 12}'
+    for cut in ('3.', '2.5e', '-1.', '1'):
+        index = document.index(cut) + len(cut)
+        assert read_object([document[:index], document[index:]]) == {'manaValue': 3.0, 'saltiness': 2500.0, 'power': -1.25, 'count': 12}
+
+def test_every_cut():
+    document = '{"a": [1, 2.5, {"b": "x, y"}], "c": -0.5e-2, "d": true, "e": null}'
+    for index in range(1, len(document)):
+        assert read_object([document[:index], document[index:]]) == {'a': [1, 2.5, {'b': 'x, y'}], 'c': -0.005, 'd': True, 'e': None}
@@ -0,0 +1,50 @@
+"""
+Benchmark of the streaming refresh, importing the fixture sets of fixtures.py from a small archive built in a temporary directory.
+
+Run with: python -m pytest benchmarks
+"""
+# Standard imports
+import json
+import time
+import zipfile
+
+# Local imports
+import global_configuration
+from benchmarks.fixtures import FIXTURE_SETS, RESULTS, MemoryDatabase
+from utils import refresh
+from utils.refresh import update_data
+
+def test_update_data(tmp_path, monkeypatch):
+    archive = tmp_path / 'AllSetFiles.zip'
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as files:
+        for code, set_data in FIXTURE_SETS.items():
+            files.writestr(f'AllSetFiles/{code}.json', json.dumps(set_data))
+    database = MemoryDatabase()
+    monkeypatch.setattr(global_configuration.DATABASE, 'database', database)
+
+    start = time.perf_counter()
+    update_data(str(archive))
+    RESULTS.append({'name': 'refresh', 'packs': len(FIXTURE_SETS), 'seconds': time.perf_counter() - start, 'calls': database.calls})
+
+    assert sorted(document['code'] for document in database['sets'].documents) == sorted(FIXTURE_SETS)
+    assert len(database['cards'].documents) == sum(len(set_data['data']['cards']) for set_data in FIXTURE_SETS.values())
+    boosters = {document['code']: document for document in database['boosters'].documents}
+    assert sorted(boosters) == sorted(FIXTURE_SETS)
+    # The samplers and color buckets are computed at import
+    assert boosters['BAL']['color_buckets']['common']['cards']
+    assert set(boosters['PLN']['samplers']['sheets']) == set(FIXTURE_SETS['PLN']['data']['booster']['draft']['sheets'])
+    assert [document['code'] for document in database['prerelease'].documents] == ['PRE']
+
+    # Nothing changed, so a second refresh only reads the hashes of the sets
+    database.calls = 0
+    update_data(str(archive))
+    assert database.calls == 1
+
+    # A new layout of the imported documents, or a full refresh, imports every set again
+    monkeypatch.setattr(refresh, 'IMPORT_FORMAT', refresh.IMPORT_FORMAT + 1)
+    update_data(str(archive))
+    assert all(document['hash'].startswith(f'{refresh.IMPORT_FORMAT}-') for document in database['sets'].documents)
+    database.calls = 0
+    update_data(str(archive), full=True)
+    assert database.calls > 1
+    assert len(database['cards'].documents) == sum(len(set_data['data']['cards']) for set_data in FIXTURE_SETS.values())
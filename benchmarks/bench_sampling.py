@@ -0,0 +1,50 @@
+"""
+Checks of the draws without duplicates of the samplers and of the generated packs.
+
+Run with: python -m pytest benchmarks
+"""
+# Pypi imports
+import numpy
+
+# Local imports
+from models.booster import create_booster
+from utils.sampling import AliasSampler, partial_shuffle
+
+# Draws of each check, enough for the frequencies to be within a percent of their probability
+ROWS = 20000
+
+def distinct_rows(matrix: numpy.ndarray) -> bool:
+    return all(len(set(row)) == len(row) for row in matrix.tolist())
+
+def test_sample_distinct_weighted():
+    weights = [5, 3, 0, 2, 1, 0, 4]
+    sampler = AliasSampler.from_weights(weights)
+    drawn = sampler.sample_distinct(ROWS, 3, numpy.random.default_rng(0))
+    assert drawn.shape == (ROWS, 3)
+    assert distinct_rows(drawn)
+    # Zero weights are never drawn
+    assert not numpy.isin(drawn, [2, 5]).any()
+    # The first draw of each row follows the weights
+    first = numpy.bincount(drawn[:, 0], minlength=len(weights)) / ROWS
+    assert numpy.allclose(first, numpy.array(weights) / sum(weights), atol=0.01)
+
+def test_sample_distinct_uniform():
+    sampler = AliasSampler.from_weights([2] * 10)
+    assert sampler.uniform
+    drawn = sampler.sample_distinct(ROWS, 4, numpy.random.default_rng(0))
+    assert distinct_rows(drawn)
+    assert numpy.allclose(numpy.bincount(drawn[:, 0], minlength=10) / ROWS, 0.1, atol=0.01)
+
+def test_partial_shuffle():
+    drawn = partial_shuffle(ROWS, 6, 3, numpy.random.default_rng(0))
+    assert drawn.shape == (ROWS, 3)
+    assert distinct_rows(drawn)
+    assert numpy.allclose(numpy.bincount(drawn[:, 0], minlength=6) / ROWS, 1 / 6, atol=0.01)
+    # Running the shuffle over every column gives a permutation of each row
+    permutations = partial_shuffle(100, 6, 6, numpy.random.default_rng(0))
+    assert (numpy.sort(permutations, axis=1) == numpy.arange(6)).all()
+
+def test_packs_without_duplicates(cold):
+    for code in ('PLN', 'BAL'):
+        packs = create_booster(code, 200, numpy.random.default_rng(0))
+        assert all(len(set(pack)) == len(pack) for pack in packs)
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the print sheet construction on a 300-card common sheet.
+
+Run with: python -m benchmarks.bench_sheets
+"""
+# Standard Imports
+import random
+import time
+
+# Local imports
+from cards_handling.sheets import Color, Sheet
+
+SHEET_SIZE = 300
+REPEAT = 20
+
+def legacy_ordered_cards(sheet: Sheet, size: int) -> list:
+    """
+    Previous implementation of Sheet.ordered_cards, listing the remaining cards for every draw.
+    """
+    cards = []
+    if sheet.colors:
+        for i in range(size):
+            for color in sheet.colors:
+                card = random.sample([i for i in sheet.cards[color.name].keys()], 1)[0]
+                cards.append(card)
+                sheet.cards[color.name][card] -= 1
+                if sheet.cards[color.name][card] == 0:
+                    sheet.cards[color.name].pop(card)
+    else:
+        for i in range(size):
+            cards.append('')
+        for i in range(size // 2):
+            card = random.sample([i for i in sheet.cards.keys()], 1)[0]
+            cards[i] = card
+            cards[size // 2 + i] = card
+            sheet.cards[card] -= 1
+            if sheet.cards[card] == 0:
+                sheet.cards.pop(card)
+    return cards
+
+def colored_sheet() -> tuple[Sheet, int]:
+    """
+    A sheet of 300 cards split between 3 colors, each card printed twice.
+    """
+    names = ['Red', 'Blue', 'Green']
+    colors = [Color(name=name, cards=[]) for name in names]
+    cards = {name: {f'{name} {i}': 2 for i in range(SHEET_SIZE // 3)} for name in names}
+    return Sheet(colors=colors, cards=cards), 2 * SHEET_SIZE // 3
+
+def plain_sheet() -> tuple[Sheet, int]:
+    """
+    A sheet of 300 cards without colors, each card printed twice.
+    """
+    return Sheet(colors=None, cards={f'Card {i}': 1 for i in range(SHEET_SIZE)}), 2 * SHEET_SIZE
+
+def measure(factory, draw) -> float:
+    """
+    Average time in seconds of drawing a whole fresh sheet.
+    """
+    total = 0.0
+    for i in range(REPEAT):
+        sheet, size = factory()
+        start = time.perf_counter()
+        draw(sheet, size)
+        total += time.perf_counter() - start
+    return total / REPEAT
+
+def main() -> None:
+    for label, factory in (('colored', colored_sheet), ('plain', plain_sheet)):
+        legacy = measure(factory, legacy_ordered_cards)
+        current = measure(factory, lambda sheet, size: sheet.ordered_cards(size, random.Random()))
+        print(f'{label:>8} sheet: legacy {legacy * 1000:8.2f} ms, multiset {current * 1000:8.2f} ms, x{legacy / current:.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Checks of the pack simulation against the in-memory database of fixtures.py.
+
+Run with: python -m pytest benchmarks
+"""
+# Pypi imports
+import numpy
+
+# Local imports
+from models.booster import compiled_booster
+from utils import parallel
+from utils.simulation import RARITY_GROUPS, simulate
+
+def test_layout_probabilities(cold):
+    boosters = compiled_booster('PLN')
+    # The fixture layouts weigh 3 and 1
+    assert numpy.allclose(boosters.layout_sampler.probabilities(), [0.75, 0.25])
+    for cards, sampler in boosters.sheets.values():
+        assert numpy.isclose(sampler.probabilities().sum(), 1)
+
+def test_simulate(cold):
+    parallel.use_seed(0)
+    statistics = simulate('PLN', 4000)
+    observed, expected = statistics['rarity']
+    expected = dict(zip(RARITY_GROUPS, expected))
+    # The expected copies of each rarity add up to the slot counts of the layouts, weighted by their probability
+    assert numpy.isclose(expected['common'], 0.75 * 10 + 0.25 * 9)
+    assert numpy.isclose(expected['uncommon'], 3)
+    assert numpy.isclose(expected['rare'] + expected['mythic'], 0.75 * 1 + 0.25 * 2)
+    assert numpy.isclose(expected['rare'] / expected['mythic'], 2 * 53 / 15)
+    assert numpy.isclose(sum(expected.values()), 14)
+    # Every pack holds 14 cards, and the observed rarities stay close to the expected ones
+    assert numpy.isclose(observed.sum(), 14)
+    assert numpy.allclose(observed, list(expected.values()), atol=0.05)
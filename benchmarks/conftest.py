@@ -0,0 +1,66 @@
+"""
+Fixtures of the benchmark suite, running against the in-memory database of fixtures.py.
+
+Run with: python -m pytest benchmarks
+"""
+# Standard Imports
+import time
+
+# Pypi imports
+import pytest
+
+# Local imports
+import global_configuration
+from benchmarks.fixtures import FIXTURE_SETS, RESULTS, MemoryDatabase, load_set
+from utils import cache, parallel, snapshot
+
+@pytest.fixture(scope='session')
+def database():
+    """
+    In-memory database holding the fixture sets, used in place of MongoDB for the whole run.
+    """
+    database = MemoryDatabase()
+    for code, set_data in FIXTURE_SETS.items():
+        load_set(database, code, set_data)
+
+    previous = global_configuration.DATABASE.database
+    global_configuration.DATABASE.database = database
+    yield database
+    global_configuration.DATABASE.database = previous
+
+@pytest.fixture
+def cold(database, tmp_path, monkeypatch):
+    """
+    Start the benchmark without any cached data, reading from the database.
+    """
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(snapshot, 'ACTIVE', None)
+    cache.MEMORY.clear()
+    parallel.use_seed(None)
+    database.calls = 0
+    return database
+
+@pytest.fixture
+def bench(cold):
+    """
+    Time a generation function over several rounds and record its packs per second and database calls per pack.
+    The first round starts from an empty cache, so the calls include loading the set.
+    """
+    def run(name: str, function, packs: int, rounds: int = 10) -> dict:
+        cold.calls = 0
+        start = time.perf_counter()
+        for i in range(rounds):
+            function()
+        elapsed = time.perf_counter() - start
+        result = {'name': name, 'packs': packs * rounds, 'seconds': elapsed, 'calls': cold.calls}
+        RESULTS.append(result)
+        return result
+    return run
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    if not RESULTS:
+        return
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f'{"benchmark":<28}{"packs":>8}{"packs/s":>12}{"DB calls":>10}{"calls/pack":>12}')
+    for result in RESULTS:
+        terminalreporter.write_line(f'{result["name"]:<28}{result["packs"]:>8}{result["packs"] / result["seconds"]:>12.0f}{result["calls"]:>10}{result["calls"] / result["packs"]:>12.3f}')
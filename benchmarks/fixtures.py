@@ -0,0 +1,154 @@
+"""
+In-memory stand-in for the database, filled with MTGJson-shaped sets, shared by the fixtures of conftest.py and the benchmarks.
+"""
+# Pypi imports
+from pymongo import ReplaceOne
+
+# Local imports
+from models.set import Set
+from utils.refresh import booster_document, card_documents, prerelease_document
+
+# Colors of the cards of a fixture set, repeated along its card list
+COLORS = [['W'], ['U'], ['B'], ['R'], ['G'], [], ['W', 'U']]
+
+# Measures of every benchmark of the run, printed at the end
+RESULTS: list[dict] = []
+
+def matches(document: dict, query: dict) -> bool:
+    """
+    Check a document against a query made of equalities and $in / $nin conditions.
+    """
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict):
+            if '$in' in condition and value not in condition['$in']:
+                return False
+            if '$nin' in condition and value in condition['$nin']:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def projected(document: dict, projection: dict | None) -> dict:
+    """
+    Apply an inclusion or exclusion projection to a document.
+    """
+    if not projection:
+        return dict(document)
+    included = [key for key, value in projection.items() if value and key != '_id']
+    if included:
+        return {key: document[key] for key in included if key in document}
+    return {key: value for key, value in document.items() if key not in projection}
+
+class MemoryCursor(list):
+    def to_list(self) -> list:
+        return list(self)
+
+class MemoryCollection:
+    """
+    Collection of the in-memory database, counting every call made to it.
+    """
+    def __init__(self, database: 'MemoryDatabase') -> None:
+        self.database = database
+        self.documents: list[dict] = []
+
+    def find_one(self, query: dict | None = None, projection: dict | None = None) -> dict | None:
+        self.database.calls += 1
+        for document in self.documents:
+            if matches(document, query or {}):
+                return projected(document, projection)
+        return None
+
+    def find(self, query: dict | None = None, projection: dict | None = None) -> MemoryCursor:
+        self.database.calls += 1
+        return MemoryCursor(projected(document, projection) for document in self.documents if matches(document, query or {}))
+
+    def insert_many(self, documents: list[dict], ordered: bool = True) -> None:
+        self.database.calls += 1
+        self.documents.extend(dict(document) for document in documents)
+
+    def insert_one(self, document: dict) -> None:
+        self.database.calls += 1
+        self.documents.append(dict(document))
+
+    def delete_many(self, query: dict) -> None:
+        self.database.calls += 1
+        self.documents = [document for document in self.documents if not matches(document, query)]
+
+    def bulk_write(self, operations: list, ordered: bool = True) -> None:
+        """
+        Apply ReplaceOne and DeleteOne operations, read from the attributes pymongo gives them.
+        """
+        self.database.calls += 1
+        for operation in operations:
+            self.documents = [document for document in self.documents if not matches(document, operation._filter)]
+            if isinstance(operation, ReplaceOne):
+                self.documents.append(dict(operation._doc))
+
+class MemoryDatabase:
+    """
+    Stand-in for the mtglimited database, supporting the queries made during generation.
+    """
+    def __init__(self) -> None:
+        self.calls = 0
+        self.collections: dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self)
+        return self.collections[name]
+
+    def list_collection_names(self) -> list[str]:
+        return list(self.collections)
+
+    def create_collection(self, name: str) -> MemoryCollection:
+        return self[name]
+
+def fixture_set(code: str, balanced: bool = False, prerelease: bool = False) -> dict:
+    """
+    Build the content of an MTGJson set file, with a draft booster of 101 commons, 80 uncommons, 53 rares and 15 mythics.
+    """
+    cards = []
+    sheets: dict[str, dict] = {}
+    for slot, rarity, size, weight in (('common', 'common', 101, 1), ('uncommon', 'uncommon', 80, 1), ('rareMythic', 'rare', 53, 2), ('rareMythic', 'mythic', 15, 1)):
+        sheet = sheets.setdefault(slot, {'cards': {}, 'foil': False, 'totalWeight': 0})
+        for i in range(size):
+            card = {'name': f'{code} {rarity} {i}', 'uuid': f'{code.lower()}-{rarity}-{i:04d}', 'colors': COLORS[i % len(COLORS)], 'rarity': rarity, 'setCode': code}
+            cards.append(card)
+            sheet['cards'][card['uuid']] = weight
+            sheet['totalWeight'] += weight
+    if balanced:
+        sheets['common']['balanceColors'] = True
+
+    booster = {'draft': {
+        'boosters': [{'contents': {'common': 10, 'uncommon': 3, 'rareMythic': 1}, 'weight': 3}, {'contents': {'common': 9, 'uncommon': 3, 'rareMythic': 2}, 'weight': 1}],
+        'boostersTotalWeight': 4,
+        'sheets': sheets,
+    }}
+    if prerelease:
+        booster['prerelease'] = {
+            'boosters': [{'contents': {'rareMythic': 1, 'uncommon': 4}, 'weight': 1}],
+            'boostersTotalWeight': 1,
+            'sheets': {'rareMythic': sheets['rareMythic'], 'uncommon': sheets['uncommon']},
+        }
+    return {'meta': {'date': '2026-10-01', 'version': '5.2.2'}, 'data': {'code': code, 'name': f'{code} fixture', 'booster': booster, 'cards': cards}}
+
+# A plain set, a color-balanced set and a set with prerelease packs
+FIXTURE_SETS = {
+    'PLN': fixture_set('PLN'),
+    'BAL': fixture_set('BAL', balanced=True),
+    'PRE': fixture_set('PRE', prerelease=True),
+}
+
+def load_set(database: MemoryDatabase, code: str, set_data: dict) -> None:
+    """
+    Store a set in the database, with the documents built by the refresh.
+    """
+    set = Set(code=code, set_data=set_data, legal=None)
+    set.check_legal()
+    database['sets'].insert_one(set.export())
+    database['cards'].insert_many(card_documents(set))
+    database['boosters'].insert_one(booster_document(set))
+    prerelease = prerelease_document(set)
+    if prerelease:
+        database['prerelease'].insert_one(prerelease)
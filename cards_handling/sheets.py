@@ -1,7 +1,12 @@
 # Local imports
-from global_configuration import DATABASE
+from global_configuration import BALANCED_SHEETS_PERSIST, BALANCED_SHEETS_POOL
+from models.card import CardTable, load_tables
+from utils import cache, parallel, profiling
+from utils.snapshot import COLOR_BITS, color_mask
 
 # Standard Imports
+import collections
+import collections.abc
 import random
 
 # Pypi imports
@@ -11,81 +16,132 @@ class Color(pydantic.BaseModel):
     name: str
     cards: list
 
+class CardMultiset:
+    """
+    Remaining copies of each card of a sheet.
+    Cards are stored in arrays and removed by swapping with the last one, so each draw is O(1).
+    """
+    __slots__ = ('cards', 'counts')
+
+    def __init__(self, counts: dict[str, int]) -> None:
+        self.cards = [card for card, count in counts.items() if count > 0]
+        self.counts = [counts[card] for card in self.cards]
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def draw(self, rng: random.Random) -> str:
+        """
+        Take one copy of a card chosen uniformly among the remaining cards.
+        """
+        index = rng.randrange(len(self.cards))
+        card = self.cards[index]
+        self.counts[index] -= 1
+        if self.counts[index] == 0:
+            self.cards[index] = self.cards[-1]
+            self.counts[index] = self.counts[-1]
+            self.cards.pop()
+            self.counts.pop()
+        return card
+
+    def peek(self, rng: random.Random) -> str:
+        """
+        Choose a card uniformly among the remaining cards without taking it.
+        """
+        return self.cards[rng.randrange(len(self.cards))]
+
 class Sheet(pydantic.BaseModel):
     colors: list[Color] | None
     cards: dict
 
-    def ordered_cards(self, size) -> list:
+    def ordered_cards(self, size, rng: random.Random) -> list:
         """
         Return the list of cards in the sheet.
         """
         cards = []
         if self.colors:
+            remaining = {color.name: CardMultiset(self.cards[color.name]) for color in self.colors}
             for i in range(size):
                 for color in self.colors:
-                    card = random.sample([i for i in self.cards[color.name].keys()], 1)[0]
-                    cards.append(card)
-                    self.cards[color.name][card] -= 1
-                    if self.cards[color.name][card] == 0:
-                        self.cards[color.name].pop(card)
+                    cards.append(remaining[color.name].draw(rng))
         else:
-            for i in range(size):
-                cards.append('')
+            remaining_cards = CardMultiset(self.cards)
+            cards = [''] * size
             for i in range(size // 2):
-                card = random.sample([i for i in self.cards.keys()], 1)[0]
+                card = remaining_cards.draw(rng)
                 cards[i] = card
                 cards[size // 2 + i] = card
-                self.cards[card] -= 1
-                if self.cards[card] == 0:
-                    self.cards.pop(card)
-            if '' in cards:
-                null_index = cards.index('')
-                card = random.sample([i for i in self.cards.keys()], 1)[0]
-                cards[null_index] = card
+            if size % 2:
+                cards[-1] = remaining_cards.peek(rng)
         return cards
 
-def fill_cards_list(sheet: dict) -> tuple[Color, Color, Color, Color, Color, list]:
-    # Get the sheet data
-    sheet_cards = [key for key in sheet['cards'].keys()]
-    
-    # Generate needed sctructures to generate the sheets
-    red = Color(name='Red', cards=list())
-    blue = Color(name='Blue', cards=list())
-    green = Color(name='Green', cards=list())
-    white = Color(name='White', cards=list())
-    black = Color(name='Black', cards=list())
-    total = list()
-    for raw_card in sheet_cards:
-        card = DATABASE['cards'].find_one({'uuid': raw_card}, {'_id': 0, 'name': 1, 'colors': 1})
-        total.append(card['name'])
-        match card['colors']:
-            case ['R']:
-                if card["name"] not in red.cards:
-                    red.cards.append(card['name'])
-            case ['U']:
-                if card["name"] not in blue.cards:
-                    blue.cards.append(card['name'])
-            case ['G']:
-                if card["name"] not in green.cards:
-                    green.cards.append(card['name'])
-            case ['W']:
-                if card["name"] not in white.cards:
-                    white.cards.append(card['name'])
-            case ['B']:
-                if card["name"] not in black.cards:
-                    black.cards.append(card['name'])
-    return red, blue, green, white, black, total
-
-def generate_sheets(sheet: dict) -> dict:
-    """
-    Generate A, B, C1 and C2 sheets for the given slot.
-    """
-    # Retrieve card list separated by colors
-    red, blue, green, white, black, sheet_cards = fill_cards_list(sheet)
+# Color of the bucket of each single color mask, the cards of several colors or colorless are in no bucket
+BUCKET_COLORS = {COLOR_BITS['R']: 'Red', COLOR_BITS['U']: 'Blue', COLOR_BITS['G']: 'Green', COLOR_BITS['W']: 'White', COLOR_BITS['B']: 'Black'}
 
+def is_balanced_slot(slot: str, sheet: dict) -> bool:
+    """
+    Check if the slot of a balanced booster is filled from color-balanced print sheets.
+    """
+    return 'balanceColors' in sheet or ("common" in slot.lower() and "uncommon" not in slot.lower())
+
+def color_buckets(cards: collections.abc.Iterable[tuple[str, int]]) -> dict[str, list[str]]:
+    """
+    Split the cards of a sheet, given as their name and colors mask, into the distinct names of each single color.
+    The name of every card of the sheet is listed in order under 'cards'.
+    """
+    buckets: dict[str, list[str]] = {color: [] for color in BUCKET_COLORS.values()}
+    seen: set[tuple[str, str]] = set()
+    total = []
+    for name, mask in cards:
+        total.append(name)
+        color = BUCKET_COLORS.get(mask)
+        if color and (color, name) not in seen:
+            seen.add((color, name))
+            buckets[color].append(name)
+    buckets['cards'] = total
+    return buckets
+
+def booster_buckets(sheets: dict, cards: list[dict]) -> dict[str, dict[str, list[str]]]:
+    """
+    Compute the color buckets of every balanced sheet of a booster, from the cards of its set.
+    A sheet with a card from another set is left out, its buckets are computed from the card table when generating.
+    """
+    cards_colors = {card['uuid']: (card['name'], color_mask(card['colors'])) for card in cards}
+    buckets = {}
+    for slot, sheet in sheets.items():
+        if is_balanced_slot(slot, sheet) and all(card_id in cards_colors for card_id in sheet['cards']):
+            buckets[slot] = color_buckets(cards_colors[card_id] for card_id in sheet['cards'])
+    return buckets
+
+def fill_cards_list(sheet: dict, table: CardTable | None = None, buckets: dict[str, list[str]] | None = None) -> tuple[Color, Color, Color, Color, Color, list]:
+    """
+    Separate the cards of the sheet by color, starting from the buckets computed at refresh when there are some.
+    Otherwise the colors are read from the card table of the set, and without a table the cards of the sheet are loaded with a single query.
+    """
+    if buckets is None:
+        if table is None:
+            table = CardTable()
+            for card_id in sheet['cards']:
+                table.add(card_id)
+            load_tables([table])
+        sheet_cards = [table.index[card_id] for card_id in sheet['cards']]
+        buckets = color_buckets((table.name(card), mask) for card, mask in zip(sheet_cards, table.colors[sheet_cards].tolist()))
+
+    # Generate needed sctructures to generate the sheets
+    red = Color(name='Red', cards=list(buckets['Red']))
+    blue = Color(name='Blue', cards=list(buckets['Blue']))
+    green = Color(name='Green', cards=list(buckets['Green']))
+    white = Color(name='White', cards=list(buckets['White']))
+    black = Color(name='Black', cards=list(buckets['Black']))
+    return red, blue, green, white, black, list(buckets['cards'])
+
+def build_sheets(colors: list[Color], sheet_cards: list, rng: random.Random) -> dict:
+    """
+    Build A, B, C1 and C2 sheets from the cards of a slot separated by colors.
+    The given colors and card list are consumed.
+    """
     # Choose colors for A and B
-    colors = [red, blue, green, white, black]
-    random.shuffle(colors)
+    rng.shuffle(colors)
 
      # Initialize the needed variables
     a = Sheet(colors=colors[:3], cards={colors[0].name: dict(), colors[1].name: dict(), colors[2].name: dict()})
@@ -97,20 +153,23 @@ def generate_sheets(sheet: dict) -> dict:
 
     # Shuffle the cards in each color to get a random distribution
     for color in colors:
-        random.shuffle(color.cards)
+        rng.shuffle(color.cards)
 
+    # Count the copies of each card taken by A and B
+    taken: collections.Counter[str] = collections.Counter()
     for i in range(card_subdivision):
         for color in a.colors:
             card_added = color.cards.pop()
             a.cards[color.name][card_added] = 2
-            sheet_cards.remove(card_added)
+            taken[card_added] += 1
         for color in b.colors:
             card_added = color.cards.pop()
             b.cards[color.name][card_added] = 3
-            sheet_cards.remove(card_added)
+            taken[card_added] += 1
 
     # Distribute the remaining cards in C1 and C2
-    random.shuffle(sheet_cards)
+    sheet_cards = list((collections.Counter(sheet_cards) - taken).elements())
+    rng.shuffle(sheet_cards)
 
     for i in range(card_subdivision * 3):
         card_added = sheet_cards.pop()
@@ -130,10 +189,35 @@ def generate_sheets(sheet: dict) -> dict:
                 c2.cards[card_added] = 3
 
     sheets = {
-        'A': a.ordered_cards(card_subdivision * 2),
-        'B': b.ordered_cards(card_subdivision * 3),
-        'C1': c1.ordered_cards(card_subdivision * 3),
-        'C2': c2.ordered_cards(card_subdivision * 2)
+        'A': a.ordered_cards(card_subdivision * 2, rng),
+        'B': b.ordered_cards(card_subdivision * 3, rng),
+        'C1': c1.ordered_cards(card_subdivision * 3, rng),
+        'C2': c2.ordered_cards(card_subdivision * 2, rng)
     }
 
-    return sheets
\ No newline at end of file
+    return sheets
+
+def generate_sheets_pool(sheet: dict, size: int, rng: random.Random, table: CardTable | None = None, buckets: dict[str, list[str]] | None = None) -> list[dict]:
+    """
+    Generate several sets of A, B, C1 and C2 sheets for the given slot, retrieving its cards only once.
+    """
+    red, blue, green, white, black, sheet_cards = fill_cards_list(sheet, table, buckets)
+    colors = [red, blue, green, white, black]
+
+    pool = []
+    for i in range(size):
+        pool.append(build_sheets([color.model_copy(deep=True) for color in colors], list(sheet_cards), rng))
+    return pool
+
+def balanced_sheets_pool(code: str, slot: str, sheet: dict, table: CardTable | None = None, buckets: dict[str, list[str]] | None = None) -> list[dict]:
+    """
+    Return the pool of balanced print sheets of a slot, generated once per run.
+    With a shared seed, the pool only depends on the seed, the set and the slot, and the pods of a batch or the requests of a server
+    seeding their own generation keep the pool of their process.
+    """
+    def build() -> list[dict]:
+        rng = random.Random(int(parallel.shared_rng('balanced_sheets', code, slot).integers(2**63)))
+        with profiling.stage('sheet building'):
+            return generate_sheets_pool(sheet, BALANCED_SHEETS_POOL, rng, table, buckets)
+
+    return cache.load('balanced_sheets', f'{code}-{slot}-{BALANCED_SHEETS_POOL}-{parallel.SHARED_SEED}', build, persist=BALANCED_SHEETS_PERSIST)
\ No newline at end of file
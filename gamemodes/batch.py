@@ -0,0 +1,68 @@
+# Standard imports
+import json
+import os
+import time
+
+# Local imports
+import models.booster as booster
+from gamemodes.pods import Pod
+from utils import output as output_files, parallel
+
+# Pypi imports
+import click
+import pydantic
+
+class Manifest(pydantic.BaseModel):
+    # Master seed of the event, each pod without a seed gets one derived from it and the pod name
+    seed: int | None = None
+    pods: list[Pod]
+
+def shard_pods(manifest: Manifest, shard: int, shards: int) -> list[tuple[str, Pod]]:
+    """
+    Return the named pods of the given shard, numbered from 1.
+    Pods are dealt to the shards in turn, so every machine splitting the same manifest gets the same share.
+    """
+    pods = []
+    for index, pod in enumerate(manifest.pods):
+        if index % shards == shard - 1:
+            pods.append((pod.name or f'pod_{index+1}', pod))
+    return pods
+
+def new_batch(manifest_path: str, output: click.Path, shard: int = 1, shards: int = 1, jobs: int = 1) -> None:
+    """
+    Generate every pod of an event manifest in its own directory of the output directory, then write a summary of the shard.
+    The sets of all the pods are loaded once and shared between them.
+    """
+    with open(manifest_path, 'r') as f:
+        manifest = Manifest.model_validate_json(f.read())
+    names = [pod.name or f'pod_{index+1}' for index, pod in enumerate(manifest.pods)]
+    if len(set(names)) != len(names):
+        raise ValueError('The pods of the manifest must have different names')
+    pods = shard_pods(manifest, shard, shards)
+
+    # Record the seed of each pod, so that it can be generated again, and choose the sets of the chaos pods from it
+    # The pods share the data built from the seed of the manifest, such as the balanced sheet pools
+    codes = set()
+    for name, pod in pods:
+        if pod.seed is None:
+            parallel.use_seed(manifest.seed)
+            pod.seed = int(parallel.derived_rng('pod', name).integers(2**63))
+        parallel.use_seed(pod.seed, shared=False)
+        codes.update(pod.set_codes())
+
+    # Load the sets of every pod at once
+    booster.compiled_boosters(sorted(codes))
+
+    summary = []
+    for name, pod in pods:
+        parallel.use_seed(pod.seed, shared=False)
+        start = time.perf_counter()
+        directory = os.path.join(str(output), name)
+        os.makedirs(directory, exist_ok=True)
+        files = output_files.write_files(directory, pod.files(jobs))
+        print(f'-   Generated {name} ({pod.mode}, {pod.player} players)')
+        summary.append(dict(pod.model_dump(), name=name, files=[os.path.join(name, filename) for filename in files], seconds=time.perf_counter() - start))
+
+    summary_name = 'summary.json' if shards == 1 else f'summary_{shard}_of_{shards}.json'
+    with open(os.path.join(str(output), summary_name), 'w') as f:
+        json.dump({'manifest': os.path.abspath(manifest_path), 'seed': manifest.seed, 'shard': shard, 'shards': shards, 'pods': summary}, f, indent=2)
@@ -1,14 +1,31 @@
 # Standard Imports
-import random
+import collections.abc
+import itertools
 
 # Local Imports
 import models.booster as booster
 from global_configuration import DATABASE
+from utils import cache, output as output_files, parallel, profiling, snapshot
 
 # Pypi imports
 import click
+import numpy
 
-def choose_set(booster_number: int, specific_set: bool) -> list:
+def legal_sets() -> list[str]:
+    """
+    Return the code of every set playable in limited, read from the database once per refresh.
+    """
+    source = snapshot.active()
+    if source:
+        return source.legal_sets()
+
+    def build() -> list[str]:
+        with profiling.stage('document fetch'):
+            return [sets['code'] for sets in DATABASE['sets'].find({'legal':True}, {'code': 1})]
+
+    return cache.load('sets', 'legal', build)
+
+def choose_set(booster_number: int, specific_set: bool, rng: numpy.random.Generator) -> list:
     """
     Choose the sets to generate the boosters from.
     """
@@ -26,50 +43,65 @@ def choose_set(booster_number: int, specific_set: bool) -> list:
             elif total_boosters < booster_number:
                 print(f"So far, you have generated {total_boosters} boosters. You need to generate {booster_number - total_boosters} more boosters.")
     else:
-        sets = DATABASE['sets'].find({'legal':True}, {'code': 1}).to_list()
-        random.seed()
-        random_sets = random.sample(sets, booster_number)
-        for sets in random_sets:
-            boosters_to_generate.append((sets['code'], 1))
+        sets = legal_sets()
+        random_sets = rng.choice(len(sets), booster_number, replace=False)
+        for index in random_sets:
+            boosters_to_generate.append((sets[index], 1))
 
     return boosters_to_generate
 
-def chaos_formating(booster: list) -> str:
+def chaos_formating(booster: collections.abc.Iterable[collections.abc.Iterable[list]]) -> collections.abc.Iterator[str]:
     """
-    Format the chaos draft for display.
+    Format the chaos draft for display, one line at a time.
     """
     # Format the chaos draft
-    booster_str = ""
     for players_pack in booster:
         for pack in players_pack:
             for card in pack:
-                booster_str += f'1 {card}\n'
-        booster_str += '\n'
-    return booster_str
+                yield f'1 {card}\n'
+        yield '\n'
+
+def set_boosters(set_name: str, number: int, player: int, rng: numpy.random.Generator, names: bool = True) -> list[booster.Packs]:
+    """
+    Create the booster packs of a set for every player in a single batch, returning the packs of each player.
+    """
+    packs = booster.create_booster(set_name, number * player, rng, names)
+    return [packs[i * number:(i + 1) * number] for i in range(player)]
 
-def new_chaos(booster_number: int, player: int, output: click.Path, online_limited: bool, specific_set: bool) -> None:
+def chaos_files(mapping: list, player: int, online_limited: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
     """
-    Generate booster packs for a chaos draft of Magic: The Gathering.
+    Generate the booster packs of the chosen sets for a chaos draft, yielding the name and the lines of each output file.
+    The packs of each chosen set are generated for all the players at once, by jobs processes, each set from its own random stream.
+    In the jsonl format, every pack of every player is a record of packs.jsonl, holding the names of its cards only with names.
     """
-    mapping = choose_set(booster_number, specific_set)
+    # Load every chosen set at once, so the worker processes find them in the cache
+    set_names = [set_name for set_name, number in mapping]
+    # The jsonl records only need the names of the cards when asked for
+    resolve = names or output_format != 'jsonl'
+    booster.compiled_boosters(set_names, resolve)
+
+    rngs = [parallel.derived_rng('chaos', str(index), set_name) for index, set_name in enumerate(set_names)]
+    # The packs of each set are kept as generated until they are written
+    players_boosters: list[list] = [[] for i in range(player)]
+    for sets_packs in parallel.ordered_map(set_boosters, set_names, [number for set_name, number in mapping], [player] * len(mapping), rngs, [resolve] * len(mapping), jobs=jobs):
+        for boosters, packs in zip(players_boosters, sets_packs):
+            boosters.append(packs)
+
+    if output_format == 'jsonl':
+        yield 'packs.jsonl', (line for i, boosters in enumerate(players_boosters) for line in booster.packs_records(i + 1, boosters, names))
+    elif online_limited:
+        yield 'online_limited.txt', (line for boosters in players_boosters for line in chaos_formating([itertools.chain.from_iterable(boosters)]))
+    else:
+        for i, boosters in enumerate(players_boosters):
+            yield f'player_{i+1}.txt', booster.booster_formating(itertools.chain.from_iterable(boosters))
+
+def new_chaos(booster_number: int, player: int, output: click.Path, online_limited: bool, specific_set: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> None:
+    """
+    Generate booster packs for a chaos draft of Magic: The Gathering and save them in the output directory.
+    """
+    mapping = choose_set(booster_number, specific_set, parallel.derived_rng('chaos'))
     print("For each player, the following boosters will be generated:")
     for set_name, number in mapping:
         print(f"{number} booster(s) from {set_name}")
-    if online_limited:
-        boosters = []
-        for i in range(player):
-            player_boosters = []
-            for set_name, number in mapping:
-                player_boosters.extend(booster.create_booster(set_name, number))
-            boosters.append(player_boosters)
-        with open(f'{output}/online_limited.txt', 'w') as f:
-            booster_content = chaos_formating(boosters)
-            f.write(booster_content)
-    else:
-        for i in range(player):
-            boosters = []
-            for set_name, number in mapping:
-                boosters.extend(booster.create_booster(set_name, number))
-            with open(f'{output}/player_{i+1}.txt', 'w') as f:
-                booster_content = booster.booster_formating(boosters)
-                f.write(booster_content)
\ No newline at end of file
+
+    output_files.write_files(str(output), chaos_files(mapping, player, online_limited, jobs, output_format, names))
@@ -0,0 +1,92 @@
+# Standard imports
+import collections.abc
+from typing import Annotated, Literal
+
+# Local imports
+from gamemodes import chaos, prerelease, sealed
+from utils import output, parallel
+
+# Pypi imports
+import pydantic
+
+def check_pod_name(name: str) -> str:
+    """
+    Reject the names that would not give a directory of their own.
+    """
+    if name in ('.', '..'):
+        raise ValueError(f'{name!r} is not a valid pod name')
+    return name
+
+# Name of a pod, also used as the name of its output directory
+PodName = Annotated[str, pydantic.Field(pattern=r'^[\w.-]+$'), pydantic.AfterValidator(check_pod_name)]
+
+# Options shared by the pods of every mode
+class PodOptions(pydantic.BaseModel):
+    name: PodName | None = None
+    player: int = pydantic.Field(default=1, ge=1)
+    online_limited: bool = False
+    seed: int | None = None
+    # Save every pack as a record of packs.jsonl instead of text files, with the card names only when names is set
+    format: Literal['text', 'jsonl'] = 'text'
+    names: bool = False
+
+    @pydantic.model_validator(mode='after')
+    def check_output(self) -> 'PodOptions':
+        conflict = output.options_conflict(self.format, self.online_limited, self.names)
+        if conflict:
+            raise ValueError(conflict)
+        return self
+
+class LimitedPod(PodOptions):
+    mode: Literal['limited'] = 'limited'
+    set: str
+    number: int = pydantic.Field(default=6, ge=1)
+
+    def files(self, jobs: int = 1) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
+        return sealed.limited_files(self.set, self.player, self.number, self.online_limited, jobs, self.format, self.names)
+
+    def set_codes(self) -> list[str]:
+        return [self.set]
+
+class PrereleasePod(PodOptions):
+    mode: Literal['prerelease'] = 'prerelease'
+    set: str
+
+    def files(self, jobs: int = 1) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
+        return prerelease.prerelease_files(self.set, self.player, self.online_limited, jobs, self.format, self.names)
+
+    def set_codes(self) -> list[str]:
+        return [self.set]
+
+class ChaosPod(PodOptions):
+    mode: Literal['chaos'] = 'chaos'
+    booster_number: int = pydantic.Field(ge=1)
+    # Set code and number of boosters of each chosen set, chosen at random when not given
+    sets: list[tuple[str, int]] | None = None
+
+    def files(self, jobs: int = 1) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
+        """
+        Generate the pod, choosing its sets first if they were not given.
+        """
+        return chaos.chaos_files(self.chosen_sets(), self.player, self.online_limited, jobs, self.format, self.names)
+
+    def chosen_sets(self) -> list[tuple[str, int]]:
+        """
+        Return the sets of the pod, choosing them from the seed in use if they were not given.
+        """
+        if self.sets is None:
+            self.sets = chaos.choose_set(self.booster_number, False, parallel.derived_rng('chaos'))
+        return self.sets
+
+    def set_codes(self) -> list[str]:
+        return [set_name for set_name, number in self.chosen_sets()]
+
+# Any pod, told apart by its mode
+Pod = Annotated[LimitedPod | PrereleasePod | ChaosPod, pydantic.Field(discriminator='mode')]
+
+def generate_pod(pod: LimitedPod | PrereleasePod | ChaosPod) -> dict[str, str]:
+    """
+    Generate a pod from its own seed and return the content of each output file.
+    """
+    parallel.use_seed(pod.seed, shared=False)
+    return {filename: ''.join(lines) for filename, lines in pod.files()}
@@ -1,27 +1,43 @@
+# Standard imports
+import collections.abc
+
 # Local imports
 import models.booster as booster
 import models.prerelease as prerelease
+from utils import output as output_files, parallel
 
 # Pypi imports
 import click
+import numpy
+
+def player_prerelease(set_name: str, rng: numpy.random.Generator, names: bool = True) -> tuple[booster.Packs, booster.Packs]:
+    """
+    Create the 6 booster packs and the prerelease pack of a player.
+    """
+    boosters = booster.create_booster(set_name, 6, rng, names)
+    prereleases = prerelease.create_prerelease(set_name, 1, rng, names)
+    return boosters, prereleases
 
-def new_prerelease(set_name: str, player: int, output: click.Path, online_limited: bool) -> None:
+def prerelease_files(set_name: str, player: int, online_limited: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
     """
-    Generate booster packs for a prerelease event of Magic: The Gathering.
+    Generate booster packs for a prerelease event of Magic: The Gathering, yielding the name and the lines of each output file.
+    Players are generated by jobs processes, each from its own random stream, and yielded as soon as they are ready.
+    In the jsonl format, every pack of every player is a record of packs.jsonl, the prerelease pack following the 6 boosters.
     """
-    # Create the booster packs for each player
-    if online_limited:
-        boosters = booster.create_booster(set_name, player*6)
-        prereleases = prerelease.create_prerelease(set_name, player)
-        with open(f'{output}/online_limited.txt', 'w') as f:
-            booster_content = prerelease.prerelease_formating(boosters, prereleases, online_limited)
-            f.write(booster_content)
+    # Create the booster packs for each player, the jsonl records only needing the names of the cards when asked for
+    resolve = names or output_format != 'jsonl'
+    players_packs = parallel.ordered_map(player_prerelease, [set_name] * player, parallel.player_rngs(player), [resolve] * player, jobs=jobs)
+
+    if output_format == 'jsonl':
+        yield 'packs.jsonl', (line for i, packs in enumerate(players_packs) for line in booster.packs_records(i + 1, packs, names))
+    elif online_limited:
+        yield 'online_limited.txt', (line for boosters, prereleases in players_packs for line in prerelease.prerelease_formating(boosters, prereleases, online_limited))
     else :
-        for i in range(player):
-            # Create the booster packs
-            boosters = booster.create_booster(set_name, 6)
-            prereleases = prerelease.create_prerelease(set_name, 1)
-            # Save the booster packs
-            with open(f'{output}/player_{i+1}.txt', 'w') as f:
-                booster_content = prerelease.prerelease_formating(boosters, prereleases)
-                f.write(booster_content)
\ No newline at end of file
+        for i, (boosters, prereleases) in enumerate(players_packs):
+            yield f'player_{i+1}.txt', prerelease.prerelease_formating(boosters, prereleases)
+
+def new_prerelease(set_name: str, player: int, output: click.Path, online_limited: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> None:
+    """
+    Generate booster packs for a prerelease event of Magic: The Gathering and save them in the output directory.
+    """
+    output_files.write_files(str(output), prerelease_files(set_name, player, online_limited, jobs, output_format, names))
@@ -1,26 +1,33 @@
+# Standard imports
+import collections.abc
+
 # Local imports
 import models.booster as booster
+from utils import output as output_files, parallel
 
 # Pypi imports
 import click
 
-def new_limited(set_name: str, player: int, number: int, output: click.Path, online_limited: bool) -> None:
+def limited_files(set_name: str, player: int, number: int, online_limited: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> collections.abc.Iterator[tuple[str, collections.abc.Iterator[str]]]:
     """
-    Generate booster packs for a limited game of Magic: The Gathering.
+    Generate booster packs for a limited game of Magic: The Gathering, yielding the name and the lines of each output file.
+    Players are generated by jobs processes, each from its own random stream, and yielded as soon as they are ready.
+    In the jsonl format, every pack of every player is a record of packs.jsonl, holding the names of its cards only with names.
     """
-    # Create the booster packs for each player
-    if online_limited:
-        boosters = booster.create_booster(set_name, player*number)
-        
-        with open(f'{output}/online_limited.txt', 'w') as f:
-            booster_content = booster.booster_formating(boosters, online_limited)
-            f.write(booster_content)
+    # Create the booster packs for each player, the jsonl records only needing the names of the cards when asked for
+    resolve = names or output_format != 'jsonl'
+    players_boosters = parallel.ordered_map(booster.create_booster, [set_name] * player, [number] * player, parallel.player_rngs(player), [resolve] * player, jobs=jobs)
+
+    if output_format == 'jsonl':
+        yield 'packs.jsonl', (line for i, boosters in enumerate(players_boosters) for line in booster.packs_records(i + 1, [boosters], names))
+    elif online_limited:
+        yield 'online_limited.txt', (line for boosters in players_boosters for line in booster.booster_formating(boosters, online_limited))
     else :
-        for i in range(player):
-            # Create the booster packs
-            boosters = booster.create_booster(set_name, number)
+        for i, boosters in enumerate(players_boosters):
+            yield f'player_{i+1}.txt', booster.booster_formating(boosters)
 
-            # Save the booster packs
-            with open(f'{output}/player_{i+1}.txt', 'w') as f:
-                booster_content = booster.booster_formating(boosters)
-                f.write(booster_content)
\ No newline at end of file
+def new_limited(set_name: str, player: int, number: int, output: click.Path, online_limited: bool, jobs: int = 1, output_format: str = 'text', names: bool = False) -> None:
+    """
+    Generate booster packs for a limited game of Magic: The Gathering and save them in the output directory.
+    """
+    output_files.write_files(str(output), limited_files(set_name, player, number, online_limited, jobs, output_format, names))
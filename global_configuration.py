@@ -3,7 +3,6 @@ import os
 
 # Pypi imports
 import dotenv
-import pymongo
 
 #------------------------------------------#
 # Global Configuration
@@ -11,5 +10,52 @@ import pymongo
 
 dotenv.load_dotenv()
 
-MONGO_CLIENT = pymongo.MongoClient(os.getenv('MONGODB_URL'))
-DATABASE = MONGO_CLIENT.mtglimited
\ No newline at end of file
+# MongoDB connection settings, pymongo defaults are used when they are not set
+MONGODB_URL = os.getenv('MONGODB_URL')
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '100'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.environ['MONGODB_SOCKET_TIMEOUT_MS']) if os.getenv('MONGODB_SOCKET_TIMEOUT_MS') else None
+
+class LazyDatabase:
+    """
+    Handle on the mtglimited database, only importing pymongo and creating the client on first use.
+    """
+    def __init__(self) -> None:
+        self.client = None
+        self.database = None
+        # pymongo event listeners given to the client when it is created
+        self.listeners: list = []
+
+    def connect(self):
+        """
+        Return the database, creating the client if needed.
+        """
+        if self.database is None:
+            import pymongo
+            self.client = pymongo.MongoClient(
+                MONGODB_URL,
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGODB_SOCKET_TIMEOUT_MS,
+                event_listeners=self.listeners,
+            )
+            self.database = self.client.mtglimited
+        return self.database
+
+    def __getitem__(self, name: str):
+        return self.connect()[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self.connect(), name)
+
+DATABASE = LazyDatabase()
+
+# Number of color-balanced print sheets generated for each balanced slot, trading variety against speed
+BALANCED_SHEETS_POOL = int(os.getenv('BALANCED_SHEETS_POOL', '16'))
+if BALANCED_SHEETS_POOL < 1:
+    raise ValueError(f'BALANCED_SHEETS_POOL must be at least 1, got {BALANCED_SHEETS_POOL}')
+# Keep the balanced print sheets in the cache directory instead of generating them again on each run
+BALANCED_SHEETS_PERSIST = os.getenv('BALANCED_SHEETS_PERSIST', 'false').lower() in ('1', 'true', 'yes')
+
+# Directory where the compiled set definitions are stored between runs
+CACHE_DIR = os.getenv('MTGLIMITED_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mtglimited'))
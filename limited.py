@@ -1,24 +1,38 @@
-# Local imports 
-from gamemodes.chaos import new_chaos
-from gamemodes.prerelease import new_prerelease
-from gamemodes.sealed import new_limited
-
 # Pypi imports
 import click
 
+# The game modes are imported by each command so that the CLI starts without loading numpy, pydantic or pymongo
+
+def check_output(output_format: str, online_limited: bool, names: bool) -> None:
+    """
+    Refuse the output options that cannot be used together.
+    """
+    from utils.output import options_conflict
+    conflict = options_conflict(output_format, online_limited, names)
+    if conflict:
+        raise click.UsageError(conflict.capitalize())
+
 @click.command("limited", no_args_is_help=True)
 @click.argument("set_name")
 @click.option("--player", default=1, help="Number of players.", show_default=True)
 @click.option("--number", default=6, help="Number of boosters to generate per player.", show_default=True)
 @click.option("-o", "--output", required=True, help="Output Directory where the boosters will be saved.", type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
 @click.option("--online-limited", is_flag=True, default=False, help="Generate the boosters for an online draft format.")
-def limited(set_name: str, player: int, number: int, output: click.Path, online_limited: bool) -> None:
+@click.option("--seed", type=int, default=None, help="Seed of the random generation, the same seed always gives the same boosters.")
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of processes generating the players.", show_default=True)
+@click.option("--format", "output_format", type=click.Choice(["text", "jsonl"]), default="text", help="Save the card names as text files, or every pack as a record of packs.jsonl with the uuids of its cards.", show_default=True)
+@click.option("--names", is_flag=True, default=False, help="Add the card names to the jsonl records.")
+def limited(set_name: str, player: int, number: int, output: click.Path, online_limited: bool, seed: int | None, jobs: int, output_format: str, names: bool) -> None:
     """
     This command will generate booster packs for a limited game of Magic: The Gathering.
     The command will generate the specified number of boosters for each player.
     The boosters will be saved in the output directory.
     """
-    new_limited(set_name, player, number, output, online_limited)
+    check_output(output_format, online_limited, names)
+    from gamemodes.sealed import new_limited
+    from utils import parallel
+    parallel.use_seed(seed)
+    new_limited(set_name, player, number, output, online_limited, jobs, output_format, names)
 
 
 @click.command("prerelease", no_args_is_help=True)
@@ -26,13 +40,21 @@ def limited(set_name: str, player: int, number: int, output: click.Path, online_
 @click.option("--player", default=1, help="Number of players.", show_default=True)
 @click.option("-o", "--output", required=True, help="Output Directory where the boosters will be saved.", type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
 @click.option("--online-limited", is_flag=True, default=False, help="Generate the boosters for an online draft format.")
-def prerelease(set_name: str, player: int, output: click.Path, online_limited: bool) -> None:
+@click.option("--seed", type=int, default=None, help="Seed of the random generation, the same seed always gives the same boosters.")
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of processes generating the players.", show_default=True)
+@click.option("--format", "output_format", type=click.Choice(["text", "jsonl"]), default="text", help="Save the card names as text files, or every pack as a record of packs.jsonl with the uuids of its cards.", show_default=True)
+@click.option("--names", is_flag=True, default=False, help="Add the card names to the jsonl records.")
+def prerelease(set_name: str, player: int, output: click.Path, online_limited: bool, seed: int | None, jobs: int, output_format: str, names: bool) -> None:
     """
     This command will generate booster packs for a prerelease event of Magic: The Gathering.
     The command will generate the specified number of boosters for each player.
     The boosters will be saved in the output directory.
     """
-    new_prerelease(set_name, player, output, online_limited)
+    check_output(output_format, online_limited, names)
+    from gamemodes.prerelease import new_prerelease
+    from utils import parallel
+    parallel.use_seed(seed)
+    new_prerelease(set_name, player, output, online_limited, jobs, output_format, names)
 
 @click.command("chaos", no_args_is_help=True)
 @click.argument("booster_number", type=int)
@@ -40,10 +62,61 @@ def prerelease(set_name: str, player: int, output: click.Path, online_limited: b
 @click.option("-o", "--output", required=True, help="Output Directory where the boosters will be saved.", type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
 @click.option("--online-limited", is_flag=True, default=False, help="Generate the boosters for an online draft format.")
 @click.option("--specific-set", is_flag=True, default=False, help="Generate the boosters for a specific set. Will ask for the set name.")
-def chaos(booster_number: int, player: int, output: click.Path, online_limited: bool, specific_set: bool) -> None:
+@click.option("--seed", type=int, default=None, help="Seed of the random generation, the same seed always gives the same boosters.")
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of processes generating the players.", show_default=True)
+@click.option("--format", "output_format", type=click.Choice(["text", "jsonl"]), default="text", help="Save the card names as text files, or every pack as a record of packs.jsonl with the uuids of its cards.", show_default=True)
+@click.option("--names", is_flag=True, default=False, help="Add the card names to the jsonl records.")
+def chaos(booster_number: int, player: int, output: click.Path, online_limited: bool, specific_set: bool, seed: int | None, jobs: int, output_format: str, names: bool) -> None:
     """
     This command will generate a chaos draft of Magic: The Gathering.
     The command will generate the specified number of boosters for each player.
     The boosters will be saved in the output directory.
     """
-    new_chaos(booster_number, player, output, online_limited, specific_set)
\ No newline at end of file
+    check_output(output_format, online_limited, names)
+    from gamemodes.chaos import new_chaos
+    from utils import parallel
+    parallel.use_seed(seed)
+    new_chaos(booster_number, player, output, online_limited, specific_set, jobs, output_format, names)
+
+@click.command("simulate", no_args_is_help=True)
+@click.argument("set_name")
+@click.option("--packs", default=100000, help="Number of packs to open.", show_default=True, type=click.IntRange(min=1))
+@click.option("--top", default=10, help="Number of cards furthest from their expected frequency to show.", show_default=True, type=click.IntRange(min=0))
+@click.option("--seed", type=int, default=None, help="Seed of the random generation, the same seed always gives the same statistics.")
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of processes opening the packs.", show_default=True)
+def simulate(set_name: str, packs: int, top: int, seed: int | None, jobs: int) -> None:
+    """
+    This command will open many booster packs of a set without saving them, to check their content against the booster weights.
+    The frequency of each rarity, color and card is printed next to the frequency expected from the weights of the layouts and sheets.
+    """
+    from utils.simulation import new_simulation
+    from utils import parallel
+    parallel.use_seed(seed)
+    new_simulation(set_name, packs, jobs, top)
+
+def parse_shard(ctx: click.Context, param: click.Parameter, value: str) -> tuple[int, int]:
+    """
+    Read a shard given as i/n, with i between 1 and n.
+    """
+    try:
+        shard, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise click.BadParameter('expected i/n, for example 2/4') from None
+    if not 1 <= shard <= shards:
+        raise click.BadParameter('i must be between 1 and n')
+    return shard, shards
+
+@click.command("batch", no_args_is_help=True)
+@click.argument("manifest", type=click.Path(exists=True, file_okay=True, dir_okay=False))
+@click.option("-o", "--output", required=True, help="Output Directory where the pods will be saved.", type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=True))
+@click.option("--shard", default="1/1", callback=parse_shard, help="Only generate the i-th of n shares of the pods, to split an event between several machines.", show_default=True)
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of processes generating the players of a pod.", show_default=True)
+def batch(manifest: str, output: click.Path, shard: tuple[int, int], jobs: int) -> None:
+    """
+    This command will generate every pod of an event manifest.
+    The manifest is a JSON object with an optional seed and a list of pods, each with the options of its mode, for example
+    {"seed": 42, "pods": [{"name": "table_1", "mode": "limited", "set": "MH3", "player": 8}, {"mode": "chaos", "booster_number": 3, "player": 8}]}.
+    Each pod is saved in its own directory of the output directory, next to a summary of the generated pods and their seeds.
+    """
+    from gamemodes.batch import new_batch
+    new_batch(manifest, output, shard[0], shard[1], jobs)
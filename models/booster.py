@@ -1,5 +1,6 @@
 # Standard Imports
-import random
+import collections.abc
+import json
 
 # Pypi Imports
 import numpy
@@ -8,7 +9,9 @@ import pydantic
 # Local Imports
 from cards_handling import sheets
 from global_configuration import DATABASE
-from models.card import generate_card, generate_card_balanced
+from utils import cache, profiling, snapshot
+from utils.sampling import AliasSampler, load_sampler
+from models.card import CardTable, generate_card_balanced, load_tables
 
 class Booster(pydantic.BaseModel):
     layouts: list
@@ -16,98 +19,269 @@ class Booster(pydantic.BaseModel):
     sheets: dict
     balance_colors: bool
     code: str
+    samplers: dict | None = None
+    color_buckets: dict | None = None
 
-    def random_layout(self, number: int) -> list[dict]:
+    def export(self) -> dict:
+        return {'layouts': self.layouts, 'total_weight': self.total_weight, 'sheets': self.sheets, 'balance_colors': self.balance_colors, 'code': self.code, 'samplers': self.samplers, 'color_buckets': self.color_buckets}
+
+# Number of packs whose names are resolved at once when iterating over generated packs
+PACKS_BLOCK = 1024
+
+class Packs(collections.abc.Sequence):
+    """
+    Generated packs, stored as a matrix of indexes in the card table of their booster padded with -1, along with the slot of each card.
+    Each pack is only turned into the names of its cards when it is read.
+    """
+    __slots__ = ('cards', 'slots', 'booster')
+
+    def __init__(self, cards: numpy.ndarray, slots: numpy.ndarray, booster: 'CompiledBooster') -> None:
+        self.cards = cards
+        # Index of the slot of each card in the slot names of the booster
+        self.slots = slots
+        self.booster = booster
+
+    @property
+    def table(self) -> CardTable:
+        return self.booster.cards
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Packs(self.cards[index], self.slots[index], self.booster)
+        return self.table.pack_names(self.cards[index])
+
+    def __iter__(self) -> collections.abc.Iterator[list]:
+        # Resolve the names a block of packs at a time, much faster than pack by pack
+        for start in range(0, len(self.cards), PACKS_BLOCK):
+            yield from self.table.packs_names(self.cards[start:start + PACKS_BLOCK])
+
+    def __reduce__(self) -> tuple:
+        # Only the matrices are pickled, the booster being found again in the cache of the process loading them
+        return restore_packs, (self.booster.kind, self.booster.code, not self.table.missing(), self.cards, self.slots)
+
+    def records(self, player: int, first: int = 1, names: bool = False) -> collections.abc.Iterator[str]:
         """
-        Select random layouts from this booster.
+        Return a JSON line for each pack, with its set and kind, booster or prerelease, and the slot and uuid of its cards, numbering the packs of the player from first.
+        The names of the cards are only added, and needed in the card table, when asked for.
         """
-        # Boosters_format will contain the layout of each booster
-        boosters_format = []
-        # Boosters_weight will contain the cummulative weight of each layout for the random selection
-        boosters_weight = []
-        for layout in self.layouts:
-            if not boosters_weight:
-                boosters_weight.append(layout['weight'])
-            else:   
-                boosters_weight.append(boosters_weight[-1] + layout['weight'])
-        # Choosing a random layout weight for each booster
-        random_cards = [random.randint(1, self.total_weight) for i in range(number)]
-        # Find the corresponding layout for each random weight
-        chosen_layouts = numpy.searchsorted(boosters_weight, random_cards)
-        for layout_index in chosen_layouts:
-            boosters_format.append(self.layouts[layout_index]['contents'])
-
-        return boosters_format
+        uuids = self.table.uuids
+        slot_names = self.booster.slot_names
+        for start in range(0, len(self.cards), PACKS_BLOCK):
+            block = self.cards[start:start + PACKS_BLOCK]
+            packs_names = self.table.packs_names(block) if names else None
+            for offset, (pack, slots) in enumerate(zip(block.tolist(), self.slots[start:start + PACKS_BLOCK].tolist())):
+                record = {'player': player, 'pack': first + start + offset, 'set': self.booster.code, 'kind': self.booster.kind, 'slots': [slot_names[slot] for slot in slots if slot >= 0], 'uuids': [uuids[card] for card in pack if card >= 0]}
+                if packs_names is not None:
+                    record['names'] = packs_names[offset]
+                yield json.dumps(record) + '\n'
 
-    def export(self) -> dict:
-        return {'layouts': self.layouts, 'total_weight': self.total_weight, 'sheets': self.sheets, 'balance_colors': self.balance_colors, 'code': self.code} 
-    
-def boosters_content(boosters_format: list[dict], sheets: dict) -> list:
+def restore_packs(kind: str, code: str, names: bool, cards: numpy.ndarray, slots: numpy.ndarray) -> Packs:
     """
-    Create the content of a booster pack based on the given format.
+    Attach unpickled packs to the compiled booster or prerelease of their set, loaded with the names of its cards when the pickled one had them.
     """
-    # Create the booster content
-    packs = []
-    for booster_format in boosters_format:
-        pack = []
-        for slot, number in booster_format.items():
-            for i in generate_card(number, sheets[slot]):
-                pack.append(i)
-        packs.append(pack)
-    return packs
+    if kind == 'prerelease':
+        from models.prerelease import compiled_prerelease
+        return Packs(cards, slots, compiled_prerelease(code, names))
+    return Packs(cards, slots, compiled_booster(code, names))
 
-def boosters_balanced_content(boosters_format: list[dict], sheet: dict) -> list:
+class CompiledBooster:
     """
-    Create the content of a booster pack based on the given format for a balanced set.
+    Booster definition compiled into NumPy arrays to generate many packs at once.
+    Packs are produced as a matrix of indexes in the card table of the booster, and only turned into names at output time.
     """
+    def __init__(self, code: str, layouts: list, sheets: dict, balance_colors: bool = False, samplers: dict | None = None, color_buckets: dict | None = None, kind: str = 'booster') -> None:
+        self.code = code
+        # Cache kind of the booster, either booster or prerelease
+        self.kind = kind
+        self.balance_colors = balance_colors
+        # Balanced sheets are generated from the raw definition, starting from the color buckets computed at refresh
+        self.definition = sheets if balance_colors else {}
+        self.color_buckets = (color_buckets or {}) if balance_colors else {}
+        # Every card of the booster is referred to by its index in this table
+        self.cards = CardTable()
+        sheet_cards = {slot: [self.cards.add(card_id) for card_id in sheet['cards']] for slot, sheet in sheets.items()}
+        # The smallest integer type able to hold an index of the table
+        self.dtype = numpy.int16 if len(self.cards) <= numpy.iinfo(numpy.int16).max else numpy.int32
 
-    # Create the booster content
-    packs = []
-    for booster_format in boosters_format:
-        pack = []
-        for slot, number in booster_format.items():
-            if 'balanceColors' in sheet[slot] or ("common" in slot.lower() and "uncommon" not in slot.lower()):
-                balanced_sheets = sheets.generate_sheets(sheet[slot])
-                for i in generate_card_balanced(balanced_sheets, number):
-                    pack.append(i)
+        # Compile each sheet into the indexes of its cards and their sampler, reusing the samplers computed at refresh
+        samplers = samplers or {}
+        self.sheets: dict[str, tuple[numpy.ndarray, AliasSampler]] = {}
+        for slot, sheet in sheets.items():
+            self.sheets[slot] = (numpy.array(sheet_cards[slot], dtype=self.dtype), load_sampler(samplers.get('sheets', {}).get(slot), list(sheet['cards'].values())))
+        # The slot of each card of a pack is stored as its index in this list
+        self.slot_names = list(self.sheets)
+        # Like in real boosters, a pack never holds two copies of a card from the same sheet, unless the sheet allows it
+        self.duplicates = {slot for slot, sheet in sheets.items() if sheet.get('allowDuplicates')}
+
+        # Compile the layouts into their sampler and the columns of each slot in a pack
+        self.layouts: list[dict] = [layout['contents'] for layout in layouts]
+        self.layout_sampler = load_sampler(samplers.get('layouts'), [layout['weight'] for layout in layouts])
+        self.width = max(sum(contents.values()) for contents in self.layouts)
+        self.columns: list[dict[str, numpy.ndarray]] = []
+        for contents in self.layouts:
+            columns = {}
+            start = 0
+            for slot, number in contents.items():
+                columns[slot] = numpy.arange(start, start + number)
+                start += number
+            self.columns.append(columns)
+
+    def random_layout(self, number: int, rng: numpy.random.Generator) -> numpy.ndarray:
+        """
+        Select the index of a random layout for each booster.
+        """
+        return self.layout_sampler.sample(number, rng)
+
+    def draw(self, slot: str, rows: int, number: int, rng: numpy.random.Generator) -> numpy.ndarray:
+        """
+        Draw the given number of cards of the slot for each of the given rows of packs, as a matrix of indexes in the card table.
+        """
+        cards, sampler = self.sheets[slot]
+        if slot in self.duplicates:
+            return cards[sampler.sample(rows * number, rng).reshape(rows, number)]
+        return cards[sampler.sample_distinct(rows, number, rng)]
+
+    def generate_packs(self, number: int, rng: numpy.random.Generator | None = None) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Generate the given number of packs, drawing the cards of a slot for every pack of a layout with a single vectorized call.
+        Return the matrix of the cards of the packs and the matrix of the slot of each card.
+        """
+        if rng is None:
+            rng = numpy.random.default_rng()
+        packs = numpy.full((number, self.width), -1, dtype=self.dtype)
+        slots = numpy.full((number, self.width), -1, dtype=numpy.int8)
+
+        # Group the packs by layout
+        layouts = self.random_layout(number, rng)
+        members = [numpy.flatnonzero(layouts == index) for index in range(len(self.layouts))]
+        # The balanced slots are filled pack by pack from their pool of print sheets
+        pools = {slot: self.balanced_pool(slot) for slot, sheet in self.definition.items() if sheets.is_balanced_slot(slot, sheet)}
+        short = False
+
+        for index, layout_columns in enumerate(self.columns):
+            rows = members[index]
+            if not len(rows):
+                continue
+            # Draw the cards of each other slot for all the packs of this layout at once
+            for slot, columns in layout_columns.items():
+                if slot in pools:
+                    for row in rows.tolist():
+                        cards = generate_card_balanced(pools[slot], len(columns), rng)
+                        packs[row, columns[:len(cards)]] = cards
+                        slots[row, columns[:len(cards)]] = self.slot_names.index(slot)
+                        short = short or len(cards) < len(columns)
+                else:
+                    packs[rows[:, numpy.newaxis], columns] = self.draw(slot, len(rows), len(columns), rng)
+                    slots[rows[:, numpy.newaxis], columns] = self.slot_names.index(slot)
+
+        if short:
+            # Move the cards missing from a balanced slot to the padding at the end of their pack
+            order = numpy.argsort(packs < 0, axis=1, kind='stable')
+            packs = numpy.take_along_axis(packs, order, axis=1)
+            slots = numpy.take_along_axis(slots, order, axis=1)
+        return packs, slots
+
+    def balanced_pool(self, slot: str) -> list[dict[str, list[int]]]:
+        """
+        Return the pool of balanced print sheets of the slot, with each name turned into the first card of the slot with this name.
+        """
+        pool = sheets.balanced_sheets_pool(self.code, slot, self.definition[slot], self.cards, self.color_buckets.get(slot))
+        card_index = {self.cards.name(card): card for card in reversed(self.sheets[slot][0].tolist())}
+        return [{key: [card_index[name] for name in names] for key, names in balanced_sheets.items()} for balanced_sheets in pool]
+
+    def packs(self, number: int, rng: numpy.random.Generator | None = None) -> Packs:
+        """
+        Generate the given number of packs, read as the names of their cards.
+        """
+        return Packs(*self.generate_packs(number, rng), self)
+
+def compile_booster(expansion: str, document: dict | None) -> CompiledBooster:
+    """
+    Validate and compile the booster document of the given expansion.
+    """
+    try:
+        with profiling.stage('validation'):
+            boosters = Booster.model_validate(document)
+    except pydantic.ValidationError as e:
+        raise ValueError(f'No booster data for {expansion}') from e
+    with profiling.stage('compilation'):
+        return CompiledBooster(boosters.code, boosters.layouts, boosters.sheets, boosters.balance_colors, boosters.samplers, boosters.color_buckets)
+
+def compiled_boosters(expansions: list[str], names: bool = True) -> dict[str, CompiledBooster]:
+    """
+    Load the compiled boosters of the given expansions.
+    The ones that are not cached are fetched with a single query, and the names of their cards with another one.
+    Without names, the names of the cards are only loaded for the balanced sets, which need them to build their sheets.
+    """
+    source = snapshot.active()
+    # The snapshot is already stored on disk
+    persist = source is None
+    cached = {code: cache.lookup('booster', code, CompiledBooster, persist) for code in dict.fromkeys(expansions)}
+
+    missing = [code for code, compiled in cached.items() if compiled is None]
+    built = {}
+    if missing:
+        with profiling.stage('document fetch'):
+            if source:
+                documents = {code: source.document('boosters', code) for code in missing}
             else:
-                for i in generate_card(number, sheet[slot]):
-                    pack.append(i)
-        packs.append(pack)
-    return packs
+                documents = {document['code']: document for document in DATABASE['boosters'].find({'code': {'$in': missing}}, {'_id': 0})}
+        built = {code: compile_booster(code, documents.get(code)) for code in missing}
+    boosters = {code: built[code] if compiled is None else compiled for code, compiled in cached.items()}
+
+    # A booster cached without its names gets them when they are first needed, and is cached again with them
+    unresolved = [code for code, compiled in boosters.items() if (names or compiled.balance_colors) and compiled.cards.missing()]
+    load_tables(boosters[code].cards for code in unresolved)
+    for code, compiled in boosters.items():
+        if code in missing or code in unresolved:
+            boosters[code] = cache.store('booster', code, compiled, persist)
+
+    return boosters
+
+def compiled_booster(expansion: str, names: bool = True) -> CompiledBooster:
+    """
+    Load the compiled booster of the given expansion, building it from the database only when it is not cached.
+    """
+    return compiled_boosters([expansion], names)[expansion]
 
-def booster_formating(booster: list, online_draft: bool = False) -> str:
+def booster_formating(booster: collections.abc.Iterable[list], online_draft: bool = False) -> collections.abc.Iterator[str]:
     """
-    Format the booster pack for display.
+    Format the booster pack for display, one line at a time.
     """
     # Format the booster pack
-    booster_str = ""
     for pack in booster:
         for card in pack:
-            booster_str += f'1 {card}\n'
+            yield f'1 {card}\n'
         if online_draft:
-            booster_str += '\n'
-    return booster_str
+            yield '\n'
+
+def packs_records(player: int, packs: collections.abc.Iterable[Packs], names: bool = False) -> collections.abc.Iterator[str]:
+    """
+    Format the packs of a player as JSON lines, numbering them in order across the given groups of packs.
+    """
+    first = 1
+    for group in packs:
+        yield from group.records(player, first, names)
+        first += len(group)
 
-def create_booster(expansion: str, number: int) -> list:
+def create_booster(expansion: str, number: int, rng: numpy.random.Generator | None = None, names: bool = True) -> Packs:
     """
     Create a booster pack for the given expansion.
+    Every random choice is drawn from rng, a new generator seeded from the system entropy by default.
+    Without names, the names of the cards are not loaded unless the set needs them, and the packs can only be read as records.
     """
-    # Get the set data from the database
-    try:
-        boosters = Booster.model_validate(DATABASE['boosters'].find_one({'code': expansion}, {'_id': 0}))
-    except pydantic.ValidationError as e:
-        raise ValueError(f'No booster data for {expansion}') from e
+    # Get the compiled set data
+    boosters = compiled_booster(expansion, names)
     
     # Generate the random seed
-    random.seed()
+    if rng is None:
+        rng = numpy.random.default_rng()
 
-    # Choose the layout for each booster
-    booster_layouts = boosters.random_layout(number)
     # Create the booster content
-    if not boosters.balance_colors:
-        packs = boosters_content(booster_layouts, boosters.sheets)
-    else :
-        packs = boosters_balanced_content(booster_layouts, boosters.sheets)
+    with profiling.stage('card sampling'):
+        packs = boosters.packs(number, rng)
 
     return packs
\ No newline at end of file
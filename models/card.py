@@ -1,5 +1,5 @@
 # Standard imports
-import random
+import collections.abc
 
 # Pypi imports
 import pydantic
@@ -7,52 +7,125 @@ import numpy
 
 # Local imports
 from global_configuration import DATABASE
+from utils import profiling, snapshot
 
 class Card(pydantic.BaseModel):
     name: str
     uuid: str
     colors: list
     set_code: str
+    rarity: str | None = None
 
     def export(self) -> dict:
-        return {'name': self.name, 'uuid': self.uuid, 'colors': self.colors, 'set_code': self.set_code}
-    
-def generate_card(number: int, sheet: dict) -> list:
+        return {'name': self.name, 'uuid': self.uuid, 'colors': self.colors, 'set_code': self.set_code, 'rarity': self.rarity}
+
+class CardTable:
     """
-    Generate a card for the given slot.
+    Compact table of the cards of a set, each card being referred to by its index in the table.
+    Names are interned in a string table, colors are stored as bitmasks and rarities as their index in RARITIES, so packs are arrays of small ints.
     """
-    # Retrieving the total weight of the sheet
-    total_weight = sheet["totalWeight"]
-    # cards_id will contain the uuid of each the cards in the sheet
-    cards_id= []
-    # weights will contain the cumulative weight of each the cards in the sheet
-    weights = []
-    for card_id, weight in sheet["cards"].items():
-        cards_id.append(card_id)
-        if not weights:
-            weights.append(weight)
-        else:
-            weights.append(weights[-1] + weight)
-    # Generating random indexes based on the card pool and weights
-    cards_index = [random.randint(1, total_weight) for i in range(number)]
-    chosen_cards = numpy.searchsorted(weights, cards_index)
-
-    # Get the cards
-    card_list = []
-    for card_index in chosen_cards:
-        card_id = cards_id[card_index]
-        # Retrieve infos of the card in the database
-        card = Card.model_validate(DATABASE['cards'].find_one({'uuid': card_id}, {'_id': 0}))
-        card_list.append(card.name)
+    __slots__ = ('uuids', 'index', 'names', 'name_ids', 'colors', 'rarities')
+
+    def __init__(self) -> None:
+        self.uuids: list[str] = []
+        self.index: dict[str, int] = {}
+        # Distinct card names, referred to by the name id of each card, -1 while the card is not loaded
+        self.names: list[str] = []
+        self.name_ids = numpy.zeros(0, dtype=numpy.int32)
+        self.colors = numpy.zeros(0, dtype=numpy.uint8)
+        self.rarities = numpy.zeros(0, dtype=numpy.uint8)
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def add(self, card_id: str) -> int:
+        """
+        Return the index of the card, adding it to the table if needed.
+        """
+        if card_id not in self.index:
+            self.index[card_id] = len(self.uuids)
+            self.uuids.append(card_id)
+        return self.index[card_id]
+
+    def missing(self) -> list[str]:
+        """
+        Return the uuid of every card whose data is not loaded.
+        """
+        loaded = numpy.zeros(len(self.uuids), dtype=bool)
+        loaded[:len(self.name_ids)] = self.name_ids >= 0
+        return [self.uuids[index] for index in numpy.flatnonzero(~loaded).tolist()]
+
+    def fill(self, cards: collections.abc.Iterable[dict]) -> None:
+        """
+        Store the name, colors and rarity of the given card documents.
+        """
+        name_ids = numpy.full(len(self.uuids), -1, dtype=numpy.int32)
+        name_ids[:len(self.name_ids)] = self.name_ids
+        colors = numpy.zeros(len(self.uuids), dtype=numpy.uint8)
+        colors[:len(self.colors)] = self.colors
+        rarities = numpy.full(len(self.uuids), len(snapshot.RARITIES), dtype=numpy.uint8)
+        rarities[:len(self.rarities)] = self.rarities
 
-    return card_list
+        name_index = {name: name_id for name_id, name in enumerate(self.names)}
+        for card in cards:
+            index = self.index.get(card['uuid'])
+            if index is None:
+                continue
+            if card['name'] not in name_index:
+                name_index[card['name']] = len(self.names)
+                self.names.append(card['name'])
+            name_ids[index] = name_index[card['name']]
+            colors[index] = snapshot.color_mask(card.get('colors', []))
+            rarities[index] = snapshot.rarity_code(card.get('rarity'))
+        self.name_ids = name_ids
+        self.colors = colors
+        self.rarities = rarities
 
-def generate_card_balanced(balanced_sheets: dict, number: int) -> list:
+    def name(self, card: int) -> str:
+        return self.names[self.name_ids[card]]
+
+    def pack_names(self, cards: numpy.ndarray) -> list[str]:
+        """
+        Return the names of the given cards, ignoring the -1 padding of a pack.
+        """
+        return self.packs_names(cards[numpy.newaxis])[0]
+
+    def packs_names(self, packs: numpy.ndarray) -> list[list[str]]:
+        """
+        Return the names of the cards of each row of a matrix of packs, in a single pass over the matrix.
+        """
+        names = self.names
+        name_ids = numpy.where(packs >= 0, self.name_ids[packs], -1).tolist()
+        return [[names[name_id] for name_id in pack if name_id >= 0] for pack in name_ids]
+
+def load_tables(tables: collections.abc.Iterable[CardTable]) -> None:
+    """
+    Load the name, colors and rarity of the cards of the given tables, retrieving every missing card in a single query.
+    """
+    tables = list(tables)
+    missing = list(dict.fromkeys(card_id for table in tables for card_id in table.missing()))
+    if missing:
+        with profiling.stage('name resolution'):
+            source = snapshot.active()
+            cards = source.cards(missing) if source else DATABASE['cards'].find({'uuid': {'$in': missing}}, {'_id': 0, 'uuid': 1, 'name': 1, 'colors': 1, 'rarity': 1})
+            cards = list(cards)
+            for table in tables:
+                table.fill(cards)
+
+    for table in tables:
+        unknown = table.missing()
+        if unknown:
+            raise ValueError(f'No card data for {unknown[0]}')
+
+def generate_card_balanced(sheets_pool: list[dict], number: int, rng: numpy.random.Generator) -> list:
     """
     Generate a card for the given slot in a balanced set.
     """
-    # Generate sheets to fill this slot    
-    match random.choice([1,2,3,4,5]):
+    # Pick the sheets used to fill this slot
+    balanced_sheets = sheets_pool[rng.integers(len(sheets_pool))]
+
+    # Choose how many cards each sheet provides
+    match int(rng.integers(1, 6)):
         case 1:
             layout = dict(A=2, B=2, C1=6)
         case 2:
@@ -64,16 +137,22 @@ def generate_card_balanced(balanced_sheets: dict, number: int) -> list:
         case 5:
             layout = dict(A=4, B=4, C2=2)
 
-    # Select the cards for each sheet
+    # Select the cards for each sheet, skipping the cards already in the pack so it never holds two copies of a card
     card_list = []
+    chosen = set()
     for sheet, card_quantity in layout.items():
-        starting_index = random.randint(0, len(balanced_sheets[sheet]) - 1)
-        for i in range(card_quantity):
+        starting_index = int(rng.integers(len(balanced_sheets[sheet])))
+        for i in range(len(balanced_sheets[sheet])):
+            if card_quantity == 0:
+                break
             card = balanced_sheets[sheet][(starting_index + i) % len(balanced_sheets[sheet])]
-            card_list.append(card)
+            if card not in chosen:
+                chosen.add(card)
+                card_list.append(card)
+                card_quantity -= 1
 
     # It is possible that the number of cards is higher than the number of cards requested
     if number < len(card_list):
-        return random.sample(card_list, number)   
+        return [card_list[i] for i in rng.choice(len(card_list), number, replace=False)]
     
     return card_list
\ No newline at end of file
@@ -1,5 +1,5 @@
 # Standard imports
-import random
+import collections.abc
 
 # Pypi imports
 import pydantic
@@ -7,93 +7,81 @@ import numpy
 
 # Local imports
 from global_configuration import DATABASE
-from models.card import generate_card
+from models.booster import CompiledBooster, Packs
+from models.card import load_tables
+from utils import cache, profiling, snapshot
 
 class PreRelease(pydantic.BaseModel):
     code: str
     layouts: list
     total_weight: int
     sheets: dict
-
-    def random_layout(self, number: int) -> list[dict]:
-        """
-        Select random layouts from this prerelease.
-        """
-        # Boosters_format will contain the layout of each prerelease
-        prerelease_format = []
-        # Boosters_weight will contain the cummulative weight of each layout for the random selection
-        prerelease_weight = []
-        for layout in self.layouts:
-            if not prerelease_weight:
-                prerelease_weight.append(layout['weight'])
-            else:   
-                prerelease_weight.append(prerelease_weight[-1] + layout['weight'])
-        # Choosing a random layout weight for each booster
-        random_cards = [random.randint(1, self.total_weight) for i in range(number)]
-        # Find the corresponding layout for each random weight
-        chosen_layouts = numpy.searchsorted(prerelease_weight, random_cards)
-        for layout_index in chosen_layouts:
-            prerelease_format.append(self.layouts[layout_index]['contents'])
-
-        return prerelease_format
+    samplers: dict | None = None
 
     def export(self) -> dict:
-        return {'code': self.code, 'layouts': self.layouts, 'total_weight': self.total_weight, 'sheets': self.sheets}
+        return {'code': self.code, 'layouts': self.layouts, 'total_weight': self.total_weight, 'sheets': self.sheets, 'samplers': self.samplers}
     
-def prerelease_content(prerelease_format: list[dict], sheets: dict) -> list:
+def compiled_prerelease(expansion: str, names: bool = True) -> CompiledBooster:
     """
-    Create the content of a booster pack based on the given format.
+    Load the compiled prerelease of the given expansion, building it from the database only when it is not cached.
+    Without names, the names of its cards are not loaded.
     """
-    # Create the booster content
-    packs = []
-    for booster_format in prerelease_format:
-        pack = []
-        for slot, number in booster_format.items():
-            for i in generate_card(number, sheets[slot]):
-                pack.append(i)
-        packs.append(pack)
-    return packs
-    
-def create_prerelease(expansion: str, number: int) -> list:
+    source = snapshot.active()
+
+    def build() -> CompiledBooster:
+        with profiling.stage('document fetch'):
+            document = source.document('prerelease', expansion) if source else DATABASE['prerelease'].find_one({'code': expansion}, {'_id': 0, 'code': 1, 'layouts': 1, 'total_weight': 1, 'sheets': 1, 'samplers': 1})
+        try :
+            with profiling.stage('validation'):
+                prereleases = PreRelease.model_validate(document)
+        except pydantic.ValidationError as e:
+            raise ValueError(f'No prerelease data for {expansion}') from e
+        with profiling.stage('compilation'):
+            return CompiledBooster(prereleases.code, prereleases.layouts, prereleases.sheets, samplers=prereleases.samplers, kind='prerelease')
+
+    # The snapshot is already stored on disk
+    persist = source is None
+    compiled = cache.load('prerelease', expansion, build, persist)
+    # A prerelease cached without its names gets them when they are first needed, and is cached again with them
+    if names and compiled.cards.missing():
+        load_tables([compiled.cards])
+        compiled = cache.store('prerelease', expansion, compiled, persist)
+    return compiled
+
+def create_prerelease(expansion: str, number: int, rng: numpy.random.Generator | None = None, names: bool = True) -> Packs:
     """
     Create a prerelease pack for the given expansion.
+    Every random choice is drawn from rng, a new generator seeded from the system entropy by default.
+    Without names, the packs can only be read as records.
     """
-    # Get the set data from the database
-    try :
-        prereleases = PreRelease.model_validate(DATABASE['prerelease'].find_one({'code': expansion}, {'_id': 0, 'code': 1, 'layouts': 1, 'total_weight': 1, 'sheets': 1}))
-    except pydantic.ValidationError as e:
-        raise ValueError(f'No prerelease data for {expansion}') from e
-    
-    # Generate the random seed
-    random.seed()
-
-    prerelease_layouts = prereleases.random_layout(number)
+    # Get the compiled set data
+    prereleases = compiled_prerelease(expansion, names)
 
     # Create the booster content
-    packs = prerelease_content(prerelease_layouts, prereleases.sheets)
+    with profiling.stage('card sampling'):
+        packs = prereleases.packs(number, rng)
 
     return packs
 
-def prerelease_formating(booster: list, prerelease: list, online_draft: bool = False) -> str:
+def prerelease_formating(booster: collections.abc.Sequence[list], prerelease: collections.abc.Sequence[list], online_draft: bool = False) -> collections.abc.Iterator[str]:
     """
-    Format the prerelease pack for display.
+    Format the prerelease pack for display, one line at a time.
+    For an online draft, each player has 6 boosters followed by a prerelease pack.
     """
     # Format the prerelease pack
-    booster_str = ""
     if not online_draft:
         for pack in booster:
             for card in pack:
-                booster_str += f'1 {card}\n'
+                yield f'1 {card}\n'
         for pack in prerelease:
             for card in pack:
-                booster_str += f'1 {card}\n'
-        booster_str += '\n'
+                yield f'1 {card}\n'
+        yield '\n'
     else:
-        for i in range(len(booster) // 6):
-            for pack in booster[i:i+6]:
+        for i, prerelease_pack in enumerate(prerelease):
+            for pack in booster[i * 6:(i + 1) * 6]:
                 for card in pack:
-                    booster_str += f'1 {card}\n'
-            for card in prerelease[i]:
-                booster_str += f'1 {card}\n'
-            booster_str += '\n'
-    return booster_str
+                    yield f'1 {card}\n'
+            for card in prerelease_pack:
+                yield f'1 {card}\n'
+            yield '\n'
@@ -5,9 +5,10 @@ class Set(pydantic.BaseModel):
     code: str
     set_data: dict
     legal: bool | None
+    hash: str | None = None
 
     def export(self) -> dict:
-        return {'code': self.code, 'legal': self.legal}
+        return {'code': self.code, 'legal': self.legal, 'hash': self.hash, 'meta': self.set_data.get('meta', {})}
     
     # Check if the set can be played in limited
     def check_legal(self) -> None:
@@ -2,7 +2,6 @@
 import os
 
 # Local imports
-from utils.refresh import refresh_sets
 import limited
 
 # PyPi imports
@@ -13,24 +12,68 @@ import click
 #------------------------------------------#
 
 @click.group()
-def run():
+@click.option("--snapshot", "snapshot_path", envvar="MTGLIMITED_SNAPSHOT", default=None, help="Read the generation data from this snapshot instead of the database.", type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option("--profile", is_flag=True, default=False, help="Print the time, database queries and peak memory of each stage of the command.")
+@click.option("--profile-output", default=None, help="Write the profile as JSON to this file instead of printing it.", type=click.Path(file_okay=True, dir_okay=False, writable=True))
+@click.pass_context
+def run(ctx: click.Context, snapshot_path: str | None, profile: bool, profile_output: str | None):
    """
    This tool is build to help you with your limited games of Magic: The Gathering.  
 
    It is a work in progress and will be updated with new features and improvements.
    """
+   if profile or profile_output:
+      from utils import profiling
+      profiling.enable()
+      ctx.call_on_close(lambda: profiling.report(profile_output))
+   if snapshot_path:
+      from utils import snapshot as snapshot_data
+      snapshot_data.use(snapshot_path)
 
 @click.command()
-def refresh() -> None:
+@click.option("--archive", default=None, help="Local copy of AllSetFiles.zip to use instead of downloading it.", type=click.Path(exists=True, file_okay=True, dir_okay=False))
+@click.option("--jobs", default=os.cpu_count() or 1, help="Number of processes parsing the set files.", show_default=True, type=click.IntRange(min=1))
+@click.option("--full", is_flag=True, default=False, help="Import every set again, even those that did not change since the last refresh.")
+def refresh(archive: str | None, jobs: int, full: bool) -> None:
    """
    Refresh the card and set data with the latest information from MTGJson.
    """
-   refresh_sets()
+   from utils.refresh import refresh_sets
+   refresh_sets(archive, jobs, full)
+
+@click.command()
+@click.argument("output", type=click.Path(file_okay=False, dir_okay=True, writable=True))
+def snapshot(output: click.Path) -> None:
+   """
+   Export the sets, boosters, prerelease and card data to a snapshot directory.
+   The snapshot can then be used with --snapshot to generate boosters without the database.
+   """
+   from utils import snapshot as snapshot_data
+   snapshot_data.export_snapshot(str(output))
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on.", show_default=True)
+@click.option("--port", default=8080, help="Port to listen on.", show_default=True, type=click.IntRange(min=0, max=65535))
+@click.option("--socket", "socket_path", default=None, help="Listen on this Unix socket instead of a TCP port.", type=click.Path(dir_okay=False))
+@click.option("--jobs", default=os.cpu_count() or 1, help="Number of processes generating the packs.", show_default=True, type=click.IntRange(min=1))
+def serve(host: str, port: int, socket_path: str | None, jobs: int) -> None:
+   """
+   Run an HTTP service generating packs, keeping the set data in memory between requests.
+   The /limited, /prerelease and /chaos endpoints take the options of their command as a JSON object,
+   for example {"set": "MH3", "player": 8, "seed": 42}, and answer with the content of each output file.
+   Restart the service after a refresh to use the new data.
+   """
+   from utils.server import run_server
+   run_server(host, port, socket_path, jobs)
 
 run.add_command(refresh)
+run.add_command(snapshot)
+run.add_command(serve)
 run.add_command(limited.limited)
 run.add_command(limited.prerelease)
 run.add_command(limited.chaos)
+run.add_command(limited.batch)
+run.add_command(limited.simulate)
 
 if __name__ == '__main__':
    run()
\ No newline at end of file
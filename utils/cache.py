@@ -0,0 +1,95 @@
+# Standard Imports
+import os
+import pickle
+import shutil
+import tempfile
+import uuid
+from typing import Callable, TypeVar, cast
+
+# Local Imports
+from global_configuration import CACHE_DIR
+
+T = TypeVar('T')
+
+# Layout of the cached objects, to increase whenever a cached class changes so older pickles are ignored
+FORMAT = 7
+
+# Compiled objects already loaded by this process, keyed by kind and set code
+MEMORY: dict[tuple[str, str], object] = {}
+
+def cache_version() -> str:
+    """
+    Return the version of the cached data, creating one if the cache is empty.
+    """
+    version_file = os.path.join(CACHE_DIR, 'version')
+    try:
+        with open(version_file, 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return invalidate()
+
+def invalidate() -> str:
+    """
+    Drop every cached object and start a new cache version.
+    Called after each refresh, since the compiled data no longer matches the database.
+    """
+    MEMORY.clear()
+    version = uuid.uuid4().hex
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Remove the previous versions
+    for entry in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    with open(os.path.join(CACHE_DIR, 'version'), 'w') as f:
+        f.write(version)
+    return version
+
+def cache_path(kind: str, code: str) -> str:
+    return os.path.join(CACHE_DIR, cache_version(), f'{kind}-{FORMAT}', f'{code}.pickle')
+
+def lookup(kind: str, code: str, expected: type[T], persist: bool = True) -> T | None:
+    """
+    Return the cached object for the given kind and set code, looking in memory then on disk, or None when it is not cached.
+    An object that is not of the expected type is treated as not cached.
+    """
+    key = (kind, code)
+    if key in MEMORY:
+        value = MEMORY[key]
+    elif not persist:
+        return None
+    else:
+        try:
+            with open(cache_path(kind, code), 'rb') as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        MEMORY[key] = value
+    return value if isinstance(value, expected) else None
+
+def store(kind: str, code: str, value: T, persist: bool = True) -> T:
+    """
+    Cache the object for the given kind and set code.
+    Objects that are not persisted only live as long as this process.
+    """
+    MEMORY[(kind, code)] = value
+    if persist:
+        path = cache_path(kind, code)
+        # Write to a temporary file first so concurrent runs never read a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path), delete=False) as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+    return value
+
+def load(kind: str, code: str, build: Callable[[], T], persist: bool = True) -> T:
+    """
+    Return the cached object for the given kind and set code, only building it when it is not cached.
+    """
+    value = lookup(kind, code, object, persist)
+    if value is None:
+        return store(kind, code, build(), persist)
+    # The object was cached by the same build
+    return cast(T, value)
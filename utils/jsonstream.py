@@ -0,0 +1,154 @@
+# Standard Imports
+import json
+import re
+from typing import IO, Iterator
+
+# Number of characters read from the file at once
+CHUNK_SIZE = 64 * 1024
+
+# First character that is not a whitespace
+NON_WHITESPACE = re.compile(r'\S')
+# Characters changing the nesting of a skipped value
+STRUCTURE = re.compile(r'["\[\]{}]')
+# Remaining content of a string, up to its closing quote
+STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Characters that can follow the decoded part of a number cut at the end of the buffer
+NUMBER_CHARACTERS = frozenset('.eE+-0123456789')
+
+class JSONStream:
+    """
+    Incremental reader of a JSON document.
+    Objects and arrays are walked one member at a time, so only the values that are kept need to fit in memory.
+    """
+    def __init__(self, file: IO[str]) -> None:
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size: int | None = None) -> bool:
+        """
+        Read more of the file, CHUNK_SIZE characters by default, dropping the part of the buffer already consumed.
+        Return False once the end of the file is reached.
+        """
+        data = self.file.read(size or CHUNK_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Return the next character that is not a whitespace, without consuming it.
+        """
+        while True:
+            match = NON_WHITESPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self.fill():
+                raise ValueError('Unexpected end of the JSON document')
+
+    def expect(self, char: str) -> None:
+        """
+        Consume the given character.
+        """
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} at position {self.pos} of the JSON buffer')
+        self.pos += 1
+
+    def read_value(self):
+        """
+        Read and return the next complete value.
+        """
+        self.peek()
+        size = CHUNK_SIZE
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut by the end of the buffer is decoded up to the cut, and may continue in the next chunk
+                cut = isinstance(value, (int, float)) and not isinstance(value, bool) and (end == len(self.buffer) or self.buffer[end] in NUMBER_CHARACTERS)
+                if not cut or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Double the read size so large values are not decoded again too many times
+            self.fill(size)
+            size *= 2
+
+    def skip_value(self) -> None:
+        """
+        Consume the next value without building it.
+        """
+        if self.peek() not in '[{':
+            self.read_value()
+            return
+
+        depth = 0
+        while True:
+            match = STRUCTURE.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                if not self.fill():
+                    raise ValueError('Unexpected end of the JSON document')
+                continue
+            self.pos = match.end()
+            char = match.group()
+            if char == '"':
+                # Jump over the string, its content may contain brackets
+                while not (end := STRING_END.match(self.buffer, self.pos)):
+                    if not self.fill():
+                        raise ValueError('Unexpected end of the JSON document')
+                self.pos = end.end()
+            elif char in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterate over the keys of the next object.
+        The value of each key must be consumed before moving to the next key.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f'Expected , or }} at position {self.pos - 1} of the JSON buffer')
+
+    def iter_array(self) -> Iterator[int]:
+        """
+        Iterate over the indexes of the next array.
+        Each item must be consumed before moving to the next one.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f'Expected , or ] at position {self.pos - 1} of the JSON buffer')
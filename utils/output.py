@@ -0,0 +1,27 @@
+# Standard Imports
+import collections.abc
+import os
+
+# Local Imports
+from utils import profiling
+
+def write_files(output: str, files: collections.abc.Iterable[tuple[str, collections.abc.Iterable[str]]]) -> list[str]:
+    """
+    Write each generated file to the output directory, as its lines are produced, and return their names.
+    """
+    written = []
+    for filename, lines in files:
+        with open(os.path.join(output, filename), 'w') as f:
+            profiling.write_lines(f, lines)
+        written.append(filename)
+    return written
+
+def options_conflict(output_format: str, online_limited: bool, names: bool) -> str | None:
+    """
+    Return why the output options of a game mode cannot be used together, or None when they can.
+    """
+    if output_format == 'jsonl' and online_limited:
+        return 'the online limited output (--online-limited) is only written in the text format'
+    if output_format != 'jsonl' and names:
+        return 'the card names (--names) are only added to the records of the jsonl format'
+    return None
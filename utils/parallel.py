@@ -0,0 +1,76 @@
+# Standard Imports
+import collections.abc
+import concurrent.futures
+import multiprocessing
+import zlib
+
+# Pypi Imports
+import numpy
+
+# Local Imports
+from utils import snapshot
+
+# Master seed of the run, None to draw it from the system entropy
+SEED: int | None = None
+# Seed of the data built once and shared by the generations of the process, such as the balanced sheet pools
+SHARED_SEED: int | None = None
+
+def use_seed(seed: int | None, shared: bool = True) -> None:
+    """
+    Set the master seed every random stream of the run is derived from.
+    A seed that is not shared only applies to the next generation, like the seed of a pod, and keeps the shared data of the process.
+    """
+    global SEED, SHARED_SEED
+    SEED = seed
+    if shared:
+        SHARED_SEED = seed
+
+def player_rngs(number: int) -> list[numpy.random.Generator]:
+    """
+    Return an independent random generator for each player, spawned from the master seed.
+    """
+    return [numpy.random.default_rng(child) for child in numpy.random.SeedSequence(SEED).spawn(number)]
+
+def derived_rng(*keys: str) -> numpy.random.Generator:
+    """
+    Return a random generator identified by the given keys.
+    With a master seed, the same keys always give the same stream, whichever process asks for it.
+    """
+    return keyed_rng(SEED, keys)
+
+def shared_rng(*keys: str) -> numpy.random.Generator:
+    """
+    Return a random generator identified by the given keys, derived from the shared seed rather than from the seed of the generation.
+    """
+    return keyed_rng(SHARED_SEED, keys)
+
+def keyed_rng(seed: int | None, keys: tuple[str, ...]) -> numpy.random.Generator:
+    """
+    Return the random generator of the given keys spawned from the seed, or one seeded from the system entropy without a seed.
+    """
+    if seed is None:
+        return numpy.random.default_rng()
+    return numpy.random.default_rng(numpy.random.SeedSequence(seed, spawn_key=tuple(zlib.crc32(key.encode()) for key in keys)))
+
+def initialize_worker(seed: int | None, shared_seed: int | None, snapshot_path: str | None) -> None:
+    """
+    Give a worker process the same seeds and data source as the main process.
+    """
+    use_seed(shared_seed)
+    use_seed(seed, shared=False)
+    if snapshot_path:
+        snapshot.use(snapshot_path)
+
+def ordered_map(function: collections.abc.Callable, *iterables: collections.abc.Iterable, jobs: int = 1) -> collections.abc.Iterator:
+    """
+    Apply the function to the items of the iterables in a pool of jobs processes, yielding the results in order.
+    With a single job, the items are processed lazily in this process.
+    """
+    if jobs <= 1:
+        yield from map(function, *iterables)
+        return
+
+    source = snapshot.active()
+    # Workers are spawned rather than forked, so they never inherit the threads and sockets of the open database connections
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'), initializer=initialize_worker, initargs=(SEED, SHARED_SEED, source.path if source else None)) as pool:
+        yield from pool.map(function, *iterables)
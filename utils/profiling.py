@@ -0,0 +1,140 @@
+# Standard Imports
+import collections.abc
+import contextlib
+import json
+import time
+import tracemalloc
+from typing import IO
+
+# Local Imports
+from global_configuration import DATABASE
+
+# Profiling is off unless enabled by the --profile option, leaving only a flag check in each stage
+ENABLED = False
+START = 0.0
+
+# Time spent in each stage, excluding its nested stages, with its number of calls and database queries
+STAGES: dict[str, dict] = {}
+# Time accumulated by the nested stages of each running stage
+STACK: list[list] = []
+# Number and duration of every database command, by command name
+COMMANDS: dict[str, dict] = {}
+
+def current_stage() -> str:
+    """
+    Return the name of the innermost running stage.
+    """
+    return STACK[-1][0] if STACK else 'other'
+
+def stage_totals(name: str) -> dict:
+    if name not in STAGES:
+        STAGES[name] = {'seconds': 0.0, 'calls': 0, 'queries': 0}
+    return STAGES[name]
+
+def enable() -> None:
+    """
+    Start collecting the stage timings, the database commands and the peak memory.
+    Must be called before the first database query, as the listener is given to the client when it is created.
+    Only this process is profiled, the players generated by the worker processes of --jobs are not counted.
+    """
+    global ENABLED, START
+    import pymongo.monitoring
+
+    class CommandCounter(pymongo.monitoring.CommandListener):
+        """
+        Count the database commands, attributing each one to the stage that sent it.
+        """
+        def started(self, event) -> None:
+            stage_totals(current_stage())['queries'] += 1
+
+        def succeeded(self, event) -> None:
+            self.record(event)
+
+        def failed(self, event) -> None:
+            self.record(event)
+
+        def record(self, event) -> None:
+            command = COMMANDS.setdefault(event.command_name, {'count': 0, 'seconds': 0.0})
+            command['count'] += 1
+            command['seconds'] += event.duration_micros / 1e6
+
+    DATABASE.listeners.append(CommandCounter())
+    tracemalloc.start()
+    ENABLED = True
+    START = time.perf_counter()
+
+@contextlib.contextmanager
+def stage(name: str) -> collections.abc.Iterator[None]:
+    """
+    Time the enclosed code as the given stage.
+    """
+    if not ENABLED:
+        yield
+        return
+
+    STACK.append([name, 0.0])
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = STACK.pop()[1]
+        totals = stage_totals(name)
+        totals['seconds'] += elapsed - nested
+        totals['calls'] += 1
+        if STACK:
+            STACK[-1][1] += elapsed
+
+def iterate(name: str, iterable: collections.abc.Iterable) -> collections.abc.Iterable:
+    """
+    Time the production of every item of the iterable as the given stage.
+    """
+    if not ENABLED:
+        return iterable
+    return timed_items(name, iter(iterable))
+
+def timed_items(name: str, iterator: collections.abc.Iterator) -> collections.abc.Iterator:
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def write_lines(f: IO[str], lines: collections.abc.Iterable[str]) -> None:
+    """
+    Write formatted lines to the file, timing the formatting and the writing as separate stages.
+    """
+    with stage('file write'):
+        f.writelines(iterate('formatting', lines))
+
+def summary() -> dict:
+    """
+    Return the collected profile.
+    """
+    return {
+        'seconds': time.perf_counter() - START,
+        'peak_memory': tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+        'stages': STAGES,
+        'commands': COMMANDS,
+    }
+
+def report(output: str | None = None) -> None:
+    """
+    Print the profile as a table, or write it as JSON to the output file.
+    """
+    profile = summary()
+    if output:
+        with open(output, 'w') as f:
+            json.dump(profile, f, indent=2)
+        return
+
+    print(f'\n{"stage":<20}{"seconds":>10}{"calls":>10}{"queries":>10}')
+    for name, totals in sorted(STAGES.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        print(f'{name:<20}{totals["seconds"]:>10.3f}{totals["calls"]:>10}{totals["queries"]:>10}')
+    for name, command in sorted(COMMANDS.items()):
+        print(f'database {name:<11}{command["seconds"]:>10.3f}{command["count"]:>10}')
+    print(f'{"total":<20}{profile["seconds"]:>10.3f}')
+    if profile['peak_memory'] is not None:
+        print(f'Peak memory: {profile["peak_memory"] / 2**20:.1f} MiB')
@@ -1,122 +1,254 @@
 # Standard Imports
-import json
+import collections
+import concurrent.futures
+import io
+import multiprocessing
 import os
-import subprocess
+import queue
 import tempfile
+import threading
+import zipfile
+from typing import IO
 
 # Pypi Imports
 import requests
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import OperationFailure
 
 # Local Imports
+from cards_handling.sheets import booster_buckets
 from global_configuration import DATABASE
 from models.booster import Booster
 from models.set import Set
 from models.prerelease import PreRelease
 from models.card import Card
+from utils import cache
+from utils.jsonstream import JSONStream
+from utils.sampling import samplers_document
 
-def download_sets(dir: str) -> None:
+MTGJSON_URL = 'https://mtgjson.com/api/v5/AllSetFiles.zip'
+CHUNK_SIZE = 1024 * 1024
+# Number of parsed sets written to the database at once
+WRITE_BATCH_SIZE = 16
+# Number of parsed sets waiting to be written before the parsing pauses
+WRITE_QUEUE_SIZE = 64
+# Card fields kept when reading a set file
+CARD_FIELDS = ('name', 'uuid', 'colors', 'rarity')
+# Error code of MongoDB when a unique index is violated
+DUPLICATE_KEY_ERROR = 11000
+# Layout of the imported documents, to increase whenever they change so every set is imported again at the next refresh
+IMPORT_FORMAT = 1
+
+def download_sets(dir: str, url: str = MTGJSON_URL) -> str:
     """
     Download the latest set data from MTGJson.
+    The archive is streamed to disk in chunks and its path is returned.
     """
-    # Download the latest set data
+    archive = os.path.join(dir, 'AllSetFiles.zip')
     try :
-        data = requests.get(url='https://mtgjson.com/api/v5/AllSetFiles.zip', stream=True)
-        result = data.content
-    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        with requests.get(url=url, stream=True) as data:
+            data.raise_for_status()
+            total = int(data.headers.get('content-length', 0))
+            downloaded = 0
+            with open(archive, 'wb') as f:
+                for chunk in data.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    progress = f'{downloaded / total:.0%}' if total else f'{downloaded // CHUNK_SIZE} MB'
+                    print(f'\rDownloading set data: {progress}', end='', flush=True)
+        print()
+    except requests.exceptions.RequestException as e:
         print(f'An error occured while downloading files from MTGJson: {e}')
         raise e
-    
-    # Save the data to a file
-    temp_file = os.path.join(dir, 'AllSetFiles.zip')
-    with open(temp_file, 'wb') as f:
-        f.write(result)
-        try : 
-            subprocess.run(['unzip', temp_file, '-d', dir], check=True)
-            os.remove(temp_file)
-        except subprocess.CalledProcessError as e:
-            print(f'An error occured while unzipping the file: {e}')
-            raise e
+    return archive
         
-def update_boosters(set: Set) -> None:
+def booster_document(set: Set) -> dict:
     """
-    Update the boosters in the database with the latest information from MTGJson.
+    Build the booster document of the set from the latest information from MTGJson.
     """
     # Get the booster data
     booster_name = set.get_booster()
     boosters_data = set.set_data['data']['booster']
 
-    print(f'-   Adding booster data for {set.code} to the database')
-    
-    # Add the missing boosters to the database
-    booster = Booster(layouts=boosters_data[booster_name]['boosters'], total_weight=boosters_data[booster_name]['boostersTotalWeight'], sheets=boosters_data[booster_name]['sheets'], balance_colors=set.is_balanced(), code=set.code)
-    new_booster = dict(booster.export())
-    
-    DATABASE['boosters'].insert_one(new_booster)
+    layouts = boosters_data[booster_name]['boosters']
+    sheets = boosters_data[booster_name]['sheets']
+    # The cards of the balanced sheets are sorted by color once, rather than on every generation
+    color_buckets = booster_buckets(sheets, set.set_data['data']['cards']) if set.is_balanced() else None
+    booster = Booster(layouts=layouts, total_weight=boosters_data[booster_name]['boostersTotalWeight'], sheets=sheets, balance_colors=set.is_balanced(), code=set.code, samplers=samplers_document(layouts, sheets), color_buckets=color_buckets)
+    return dict(booster.export())
 
-def update_cards(set: Set) -> None:
+def card_documents(set: Set) -> list[dict]:
     """
-    Update the cards in the database with the latest information from MTGJson.
+    Build the card documents of the set from the latest information from MTGJson.
     """
     # Get the card data
     cards = set.set_data['data']['cards']
-    
-    # Retrieve the data from the database
-    print(f'-   Adding card data to the database')
-    remote_cards = DATABASE['cards'].find({}, {'_id': 0,'uuid': 1})
 
-    # Add the missing cards to the database
-    for card in cards:
-        if not card['uuid'] in remote_cards:
-            card_data = Card(name=card['name'], uuid=card['uuid'], colors=card['colors'], set_code=set.code)
-            DATABASE['cards'].insert_one(card_data.export())
+    return [Card(name=card['name'], uuid=card['uuid'], colors=card['colors'], set_code=set.code, rarity=card.get('rarity')).export() for card in cards]
 
-def update_prerelease(set: Set) -> None:
+def prerelease_document(set: Set) -> dict | None:
     """
-    Update the prerelease in the database with the latest information from MTGJson.
+    Build the prerelease document of the set from the latest information from MTGJson, if the set has one.
     """
     # Get the prerelease data
     prerelease_data = set.set_data['data'].get('booster',{}).get('prerelease', {})
     if not prerelease_data:
-        print(f'-   No prerelease data found for {set.code}')
-    else :
-        # Add the missing prerelease to the database
-        print(f'-   Adding prerelease data for {set.code} to the database')
-        prerelease = PreRelease(code=set.code, layouts=prerelease_data['boosters'], total_weight=prerelease_data['boostersTotalWeight'], sheets=prerelease_data['sheets'])
-        DATABASE['prerelease'].insert_one(prerelease.export())
-        
-def update_data(dir: str) -> None:
+        return None
+    prerelease = PreRelease(code=set.code, layouts=prerelease_data['boosters'], total_weight=prerelease_data['boostersTotalWeight'], sheets=prerelease_data['sheets'], samplers=samplers_document(prerelease_data['boosters'], prerelease_data['sheets']))
+    return prerelease.export()
+
+def content_hash(member: zipfile.ZipInfo) -> str:
     """
-    Update the set data in the database with the latest information from MTGJson.
+    Return the hash of a set file, read from the archive index without decompressing the file.
+    It includes the layout of the imported documents, so a set is imported again when they change.
     """
-    # Get the list of all sets
-    sets = os.listdir(dir)
+    return f'{IMPORT_FORMAT}-{member.CRC:08x}-{member.file_size}'
 
+def read_set_file(f: IO[str]) -> dict:
+    """
+    Stream a set file, keeping only the meta, the booster data and the name, uuid, colors and rarity of the cards.
+    The tokens, translations and every other card field are skipped without being built.
+    """
+    stream = JSONStream(f)
+    set_data: dict = {'meta': {}, 'data': {}}
+    for key in stream.iter_object():
+        if key == 'meta':
+            set_data['meta'] = stream.read_value()
+        elif key == 'data':
+            for data_key in stream.iter_object():
+                if data_key == 'booster':
+                    set_data['data']['booster'] = stream.read_value()
+                elif data_key == 'cards':
+                    cards = []
+                    for i in stream.iter_array():
+                        card = {}
+                        for card_key in stream.iter_object():
+                            if card_key in CARD_FIELDS:
+                                card[card_key] = stream.read_value()
+                            else:
+                                stream.skip_value()
+                        cards.append(card)
+                    set_data['data']['cards'] = cards
+                else:
+                    stream.skip_value()
+        else:
+            stream.skip_value()
+    return set_data
+
+# Archives opened by this process, so that each worker only reads the archive index once
+ARCHIVES: dict[str, zipfile.ZipFile] = {}
+
+def parse_set(archive: str, filename: str, code: str, set_hash: str) -> dict:
+    """
+    Parse a set file of the archive into the documents to write to the database.
+    Runs in a worker process, without any access to the database.
+    """
+    if archive not in ARCHIVES:
+        ARCHIVES[archive] = zipfile.ZipFile(archive)
+    with ARCHIVES[archive].open(filename) as f:
+        data = read_set_file(io.TextIOWrapper(f, encoding='utf-8'))
+
+    set = Set(code=code, set_data=data, legal=None, hash=set_hash)
+    # Check if the set is legal
+    set.check_legal()
+
+    # The boosters and prerelease data are only kept if the set is legal
+    return {
+        'code': code,
+        'set': set.export(),
+        'booster': booster_document(set) if set.legal else None,
+        'prerelease': prerelease_document(set) if set.legal else None,
+        'cards': card_documents(set),
+    }
+
+def write_sets(parsed_sets: list[dict]) -> None:
+    """
+    Replace the data of the given sets in the database with a few bulk writes.
+    """
+    codes = [parsed['code'] for parsed in parsed_sets]
+
+    # Upsert the cards of the sets by uuid, then remove the ones that are no longer part of them
+    cards = [card for parsed in parsed_sets for card in parsed['cards']]
+    if cards:
+        DATABASE['cards'].bulk_write([ReplaceOne({'uuid': card['uuid']}, card, upsert=True) for card in cards], ordered=False)
+    DATABASE['cards'].delete_many({'set_code': {'$in': codes}, 'uuid': {'$nin': [card['uuid'] for card in cards]}})
+
+    # Replace the boosters and prerelease, removing the ones that no longer exist
+    for collection, key in (('boosters', 'booster'), ('prerelease', 'prerelease')):
+        operations = [ReplaceOne({'code': parsed['code']}, parsed[key], upsert=True) if parsed[key] else DeleteOne({'code': parsed['code']}) for parsed in parsed_sets]
+        DATABASE[collection].bulk_write(operations, ordered=False)
+
+    # Record the sets last, so an interrupted import is retried on the next refresh
+    DATABASE['sets'].bulk_write([ReplaceOne({'code': parsed['code']}, parsed['set'], upsert=True) for parsed in parsed_sets], ordered=False)
+
+    for parsed in parsed_sets:
+        print(f"-   Added set {parsed['code']} to the database ({'legal' if parsed['set']['legal'] else 'not legal'}, {len(parsed['cards'])} cards)")
+
+def write_worker(writes: queue.Queue, errors: list) -> None:
+    """
+    Write the parsed sets coming from the queue in batches, until None is received.
+    """
+    batch: list[dict] = []
+    while True:
+        parsed = writes.get()
+        if parsed is not None:
+            batch.append(parsed)
+        if parsed is None or len(batch) >= WRITE_BATCH_SIZE:
+            # Once an error happened, the queue is only drained so that the parsing never blocks
+            if batch and not errors:
+                try:
+                    write_sets(batch)
+                except Exception as e:
+                    errors.append(e)
+            batch = []
+        if parsed is None:
+            return
+
+def update_data(archive: str, jobs: int = 1, full: bool = False) -> None:
+    """
+    Update the set data in the database with the latest information from MTGJson.
+    Set files are read from the archive without extracting it and parsed by a pool of jobs processes,
+    while a writer thread stores the parsed sets in batches.
+    Only the sets whose content changed since the last refresh are imported, unless full is set.
+    """
     # Retrieve the data from the database
-    sets_data = DATABASE['sets'].find({}, {'_id':0 ,'code': 1}).to_list()
-
-    # Add the missing sets to the database
-    for set_name in sets:
-        # Load the set data
-        code = set_name.split('.')[0] 
-        print("Considering set : ", code)
-
-        # If the set is not in the database, add it
-        if not {'code':code} in sets_data:
-            with open(f'{dir}/{set_name}', 'r') as f:
-                data = json.loads(f.read())
-                set = Set(code=code, set_data=data, legal=None)
-                print(f'-   Adding set {code} to the database')
-                # Check if the set is legal
-                set.check_legal()
-                DATABASE['sets'].insert_one(set.export())  
-    
-                # Update the boosters and prerelease data only if the set is legal
-                #if set.legal: 
-                    #update_boosters(set)
-                    #update_prerelease(set)
+    sets_hash = {} if full else {set_data['code']: set_data.get('hash') for set_data in DATABASE['sets'].find({}, {'_id':0 ,'code': 1, 'hash': 1})}
+
+    # Find the sets whose content changed
+    changed = []
+    with zipfile.ZipFile(archive) as files:
+        for member in files.infolist():
+            set_name = os.path.basename(member.filename)
+            if member.is_dir() or not set_name.endswith('.json'):
+                continue
+            code = set_name.split('.')[0] 
+            set_hash = content_hash(member)
+            if sets_hash.get(code) != set_hash:
+                changed.append((member.filename, code, set_hash))
+    print(f'{len(changed)} set(s) changed since the last refresh')
 
-                # Update the cards data
-                #update_cards(set)
+    # The bounded queue makes the parsing wait when the database falls behind
+    writes: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    errors: list = []
+    writer = threading.Thread(target=write_worker, args=(writes, errors))
+    writer.start()
+    try:
+        # Workers are spawned rather than forked, as the writer thread is already running
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+            # Keep a bounded number of sets in flight, in archive order
+            pending: collections.deque = collections.deque()
+            for filename, code, set_hash in changed:
+                pending.append(pool.submit(parse_set, archive, filename, code, set_hash))
+                if len(pending) >= 2 * jobs:
+                    writes.put(pending.popleft().result())
+            while pending:
+                writes.put(pending.popleft().result())
+    finally:
+        writes.put(None)
+        writer.join()
+
+    if errors:
+        raise errors[0]
 
 def ensure_database() -> None:
     """
@@ -140,16 +272,52 @@ def ensure_database() -> None:
     if 'prerelease' not in collections:
         DATABASE.create_collection('prerelease')
 
-def refresh_sets() -> None:
+    # Index the keys used by the refresh and the generation lookups
+    ensure_unique_index('sets', 'code')
+    ensure_unique_index('boosters', 'code')
+    ensure_unique_index('prerelease', 'code')
+    ensure_unique_index('cards', 'uuid')
+    DATABASE['cards'].create_index('set_code')
+
+def ensure_unique_index(collection: str, key: str) -> None:
+    """
+    Create a unique index on the given key, removing the duplicated documents left by previous imports if needed.
+    """
+    try:
+        DATABASE[collection].create_index(key, unique=True)
+    except OperationFailure as e:
+        if e.code != DUPLICATE_KEY_ERROR:
+            raise e
+        print(f'-   Removing duplicated {key} from {collection}')
+        # Keep the most recently inserted document of each key, the grouping being allowed to spill to disk on large collections
+        duplicates = DATABASE[collection].aggregate([
+            {'$sort': {'_id': -1}},
+            {'$group': {'_id': f'${key}', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}},
+        ], allowDiskUse=True)
+        removed = 0
+        for duplicate in duplicates:
+            removed += DATABASE[collection].delete_many({'_id': {'$in': duplicate['ids'][1:]}}).deleted_count
+        print(f'-   Removed {removed} duplicated document(s) from {collection}')
+        DATABASE[collection].create_index(key, unique=True)
+
+def refresh_sets(archive: str | None = None, jobs: int = 1, full: bool = False) -> None:
     """
     Refresh the card and set data with the latest information from MTGJson.
+    A local copy of AllSetFiles.zip can be given instead of downloading it, and full imports every set even when it did not change.
     """
     # Ensure the database is created and ready to fill
     ensure_database()
 
-    # Create a temporary directory to download the data
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Download the latest set data
-        download_sets(temp_dir)
-        # Update the set data in the database with the latest information from MTGJson
-        update_data(temp_dir)
\ No newline at end of file
+    if archive:
+        update_data(archive, jobs, full)
+    else:
+        # Create a temporary directory to download the data
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Download the latest set data
+            archive = download_sets(temp_dir)
+            # Update the set data in the database with the latest information from MTGJson
+            update_data(archive, jobs, full)
+
+    # The compiled set definitions no longer match the database
+    cache.invalidate()
\ No newline at end of file
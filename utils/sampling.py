@@ -0,0 +1,128 @@
+# Pypi Imports
+import numpy
+
+class AliasSampler:
+    """
+    Alias table over integer weights, drawing an index in constant time.
+    Each of the n cells keeps its own index when a draw in [0, total) falls below its threshold, and gives its alias otherwise.
+    The thresholds are integers, so the draws follow the weights exactly.
+    """
+    def __init__(self, thresholds: list[int], aliases: list[int], total: int) -> None:
+        self.thresholds = numpy.array(thresholds, dtype=numpy.int64)
+        self.aliases = numpy.array(aliases, dtype=numpy.int32)
+        self.total = total
+        # Every cell of the table is full when all the weights are equal
+        self.uniform = bool(numpy.all(self.thresholds == self.total))
+        self.nonzero = int(numpy.count_nonzero(self.probabilities()))
+
+    @classmethod
+    def from_weights(cls, weights: list[int]) -> 'AliasSampler':
+        """
+        Build the alias table of the given weights with Vose's method.
+        """
+        size = len(weights)
+        total = sum(weights)
+        # Every cell holds total, so each weight is scaled by the number of cells
+        scaled = [weight * size for weight in weights]
+        thresholds = [total] * size
+        aliases = list(range(size))
+        small = [index for index, weight in enumerate(scaled) if weight < total]
+        large = [index for index, weight in enumerate(scaled) if weight >= total]
+        while small and large:
+            index = small.pop()
+            donor = large.pop()
+            # The cell of a small weight is completed by a large one
+            thresholds[index] = scaled[index]
+            aliases[index] = donor
+            scaled[donor] -= total - scaled[index]
+            if scaled[donor] < total:
+                small.append(donor)
+            else:
+                large.append(donor)
+        return cls(thresholds, aliases, total)
+
+    @classmethod
+    def from_document(cls, document: dict) -> 'AliasSampler':
+        """
+        Rebuild a sampler stored with export.
+        """
+        return cls(document['thresholds'], document['aliases'], document['total'])
+
+    def export(self) -> dict:
+        return {'thresholds': self.thresholds.tolist(), 'aliases': self.aliases.tolist(), 'total': self.total}
+
+    def __len__(self) -> int:
+        return len(self.thresholds)
+
+    def probabilities(self) -> numpy.ndarray:
+        """
+        Return the probability of drawing each index, recovered from the table.
+        """
+        size = len(self.thresholds)
+        kept = numpy.bincount(numpy.arange(size), weights=self.thresholds, minlength=size)
+        given = numpy.bincount(self.aliases, weights=self.total - self.thresholds, minlength=size)
+        return (kept + given) / (size * self.total)
+
+    def sample(self, number: int, rng: numpy.random.Generator) -> numpy.ndarray:
+        """
+        Draw the given number of indexes.
+        """
+        cells = rng.integers(len(self.thresholds), size=number)
+        return numpy.where(rng.integers(self.total, size=number) < self.thresholds[cells], cells, self.aliases[cells])
+
+    def sample_distinct(self, rows: int, number: int, rng: numpy.random.Generator) -> numpy.ndarray:
+        """
+        Draw the given number of distinct indexes for each row, as a matrix of rows lines.
+        Each row follows successive weighted draws without replacement: every index gets an exponential key divided by its weight,
+        and the smallest keys win (Efraimidis and Spirakis), for all the rows at once.
+        Equal weights only need a partial shuffle of each row, and when there are not enough indexes of nonzero weight they are drawn with replacement.
+        """
+        if number <= 1 or number > self.nonzero:
+            return self.sample(rows * number, rng).reshape(rows, number)
+        if self.uniform:
+            return partial_shuffle(rows, len(self.thresholds), number, rng)
+
+        probabilities = self.probabilities()
+
+        with numpy.errstate(divide='ignore'):
+            inverse = numpy.where(probabilities > 0, 1 / probabilities, numpy.inf).astype(numpy.float32)
+        # Exponential keys from uniform draws, which NumPy produces faster
+        keys = -numpy.log1p(-rng.random((rows, len(probabilities)), dtype=numpy.float32)) * inverse
+        chosen = numpy.argpartition(keys, number - 1, axis=1)[:, :number]
+        # Put the chosen indexes of each row in the order they were drawn
+        order = numpy.argsort(numpy.take_along_axis(keys, chosen, axis=1), axis=1)
+        return numpy.take_along_axis(chosen, order, axis=1)
+
+def partial_shuffle(rows: int, size: int, number: int, rng: numpy.random.Generator) -> numpy.ndarray:
+    """
+    Draw the given number of distinct indexes below size for each row, all equally likely.
+    The first steps of a Fisher-Yates shuffle are run on every row at once.
+    """
+    permutations = numpy.empty((rows, size), dtype=numpy.int32)
+    permutations[:] = numpy.arange(size, dtype=numpy.int32)
+    row_index = numpy.arange(rows)
+    # The position swapped with each column of every row, drawn at once
+    swaps = rng.integers(numpy.arange(number), size, size=(rows, number))
+    for column in range(number):
+        swapped = swaps[:, column]
+        chosen = permutations[row_index, swapped]
+        permutations[row_index, swapped] = permutations[:, column]
+        permutations[:, column] = chosen
+    return permutations[:, :number]
+
+def load_sampler(document: dict | None, weights: list[int]) -> AliasSampler:
+    """
+    Return the sampler stored in the document, or build it from the weights when it is missing or outdated.
+    """
+    if document and len(document['thresholds']) == len(weights) and document['total'] == sum(weights):
+        return AliasSampler.from_document(document)
+    return AliasSampler.from_weights(weights)
+
+def samplers_document(layouts: list, sheets: dict) -> dict:
+    """
+    Build the samplers of the layouts and of every sheet of a booster definition, to be stored with it.
+    """
+    return {
+        'layouts': AliasSampler.from_weights([layout['weight'] for layout in layouts]).export(),
+        'sheets': {slot: AliasSampler.from_weights(list(sheet['cards'].values())).export() for slot, sheet in sheets.items()},
+    }
@@ -0,0 +1,117 @@
+# Standard Imports
+import asyncio
+import concurrent.futures
+import functools
+import json
+import multiprocessing
+
+# Pypi Imports
+import pydantic
+
+# Local Imports
+from gamemodes.pods import ChaosPod, LimitedPod, PrereleasePod, generate_pod
+from utils import parallel, snapshot
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1024 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Pod model of each endpoint
+ENDPOINTS: dict[str, type[LimitedPod | PrereleasePod | ChaosPod]] = {
+    '/limited': LimitedPod,
+    '/prerelease': PrereleasePod,
+    '/chaos': ChaosPod,
+}
+
+class GenerationServer:
+    """
+    HTTP service generating packs with the limited, prerelease and chaos modes.
+    Each mode is a POST endpoint taking the options of its command as a JSON object, and answering with the content of each output file.
+    The generation runs in a pool of worker processes, each keeping its compiled sets, card names, balanced sheet pools and database connections between requests.
+    """
+    def __init__(self, jobs: int) -> None:
+        source = snapshot.active()
+        # Workers are spawned rather than forked, so they never inherit the sockets of the open connections
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'), initializer=parallel.initialize_worker, initargs=(None, None, source.path if source else None))
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        """
+        Run the request and return the status and the JSON content of the response.
+        """
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path not in ENDPOINTS:
+            return 404, {'error': f'Unknown endpoint {path}'}
+        if method != 'POST':
+            return 405, {'error': f'{path} only accepts POST'}
+
+        try:
+            pod = ENDPOINTS[path].model_validate_json(body or b'{}')
+        except pydantic.ValidationError as e:
+            return 400, {'error': str(e)}
+
+        try:
+            files = await asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(generate_pod, pod))
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 200, {'files': files}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answer a single HTTP request, then close the connection.
+        """
+        try:
+            try:
+                method, path, version = (await reader.readline()).decode('latin-1').split()
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, separator, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', '0'))
+            except ValueError:
+                status, content = 400, {'error': 'Malformed HTTP request'}
+            else:
+                if length < 0:
+                    status, content = 400, {'error': 'The Content-Length of the request is negative'}
+                elif length > MAX_BODY_SIZE:
+                    status, content = 413, {'error': f'The request body is larger than {MAX_BODY_SIZE} bytes'}
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        status, content = await self.dispatch(method, path.split('?')[0], body)
+                    except Exception as e:
+                        status, content = 500, {'error': repr(e)}
+
+            payload = json.dumps(content).encode()
+            writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, socket_path: str | None = None) -> None:
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            print(f'Serving on {socket_path}')
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f'Serving on http://{host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+def run_server(host: str, port: int, socket_path: str | None = None, jobs: int = 1) -> None:
+    """
+    Run the generation service until it is interrupted.
+    """
+    server = GenerationServer(jobs)
+    try:
+        asyncio.run(server.serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,119 @@
+# Standard Imports
+import time
+
+# Pypi Imports
+import numpy
+
+# Local Imports
+from models.booster import CompiledBooster, compiled_booster
+from utils import parallel, profiling
+from utils.snapshot import COLOR_BITS, RARITIES
+
+# Packs generated and counted at once by each task, the same for any number of jobs so a seed always gives the same counts
+SIMULATION_BLOCK = 16384
+
+# Groups of the color statistics, the single colors followed by the multicolor and colorless cards
+COLOR_GROUPS = (*COLOR_BITS, 'multicolor', 'colorless')
+# Groups of the rarity statistics, cards of any other rarity being counted as unknown
+RARITY_GROUPS = (*RARITIES, 'unknown')
+
+def count_block(expansion: str, packs: int, rng: numpy.random.Generator) -> numpy.ndarray:
+    """
+    Generate the given number of packs and count the copies of each card name, without building the packs of names.
+    """
+    boosters = compiled_booster(expansion)
+    with profiling.stage('card sampling'):
+        matrix, slots = boosters.generate_packs(packs, rng)
+    with profiling.stage('counting'):
+        return numpy.bincount(boosters.cards.name_ids[matrix[matrix >= 0]], minlength=len(boosters.cards.names))
+
+def expected_counts(boosters: CompiledBooster) -> numpy.ndarray:
+    """
+    Return the expected copies of each card name in a pack, from the weights of the layouts and of the sheets.
+    Cards drawn without duplicates from a sheet of unequal weights follow these frequencies only approximately, the heaviest cards being capped at one copy per pack.
+    """
+    size = len(boosters.cards.names)
+    sheets = {slot: numpy.bincount(boosters.cards.name_ids[cards], weights=sampler.probabilities(), minlength=size) for slot, (cards, sampler) in boosters.sheets.items()}
+    expected = numpy.zeros(size)
+    for probability, contents in zip(boosters.layout_sampler.probabilities(), boosters.layouts):
+        for slot, number in contents.items():
+            expected += probability * number * sheets[slot]
+    return expected
+
+def name_groups(boosters: CompiledBooster) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Return the color group and the rarity group of each card name of the booster.
+    """
+    table = boosters.cards
+    # Cards whose data is not loaded have no name
+    valid = table.name_ids >= 0
+    masks = numpy.zeros(len(table.names), dtype=numpy.uint8)
+    masks[table.name_ids[valid]] = table.colors[valid]
+    rarities = numpy.zeros(len(table.names), dtype=numpy.uint8)
+    rarities[table.name_ids[valid]] = table.rarities[valid]
+
+    colors = numpy.where(masks == 0, COLOR_GROUPS.index('colorless'), COLOR_GROUPS.index('multicolor'))
+    for group, bit in enumerate(COLOR_BITS.values()):
+        colors[masks == bit] = group
+    return colors, rarities
+
+def simulate(expansion: str, packs: int, jobs: int = 1) -> dict:
+    """
+    Generate the given number of packs of the expansion, only counting their cards, and compare the counts with the weights of the booster.
+    Every frequency is given as copies per pack.
+    """
+    # Compile the set once, so the worker processes find it in the cache
+    boosters = compiled_booster(expansion)
+
+    start = time.perf_counter()
+    blocks = [SIMULATION_BLOCK] * (packs // SIMULATION_BLOCK) + ([packs % SIMULATION_BLOCK] if packs % SIMULATION_BLOCK else [])
+    counts = numpy.zeros(len(boosters.cards.names), dtype=numpy.int64)
+    for block_counts in parallel.ordered_map(count_block, [expansion] * len(blocks), blocks, parallel.player_rngs(len(blocks)), jobs=jobs):
+        counts += block_counts
+    seconds = time.perf_counter() - start
+
+    observed = counts / packs
+    expected = expected_counts(boosters)
+    colors, rarities = name_groups(boosters)
+    return {
+        'packs': packs,
+        'seconds': seconds,
+        'names': boosters.cards.names,
+        'cards': (observed, expected),
+        'rarity': (numpy.bincount(rarities, weights=observed, minlength=len(RARITY_GROUPS)), numpy.bincount(rarities, weights=expected, minlength=len(RARITY_GROUPS))),
+        'color': (numpy.bincount(colors, weights=observed, minlength=len(COLOR_GROUPS)), numpy.bincount(colors, weights=expected, minlength=len(COLOR_GROUPS))),
+    }
+
+def difference(observed: float, expected: float) -> str:
+    """
+    Return the relative difference of an observed frequency from the expected one, or - when nothing is expected.
+    """
+    return f'{(observed - expected) / expected:+.2%}' if expected else '-'
+
+def print_simulation(expansion: str, statistics: dict, top: int = 10) -> None:
+    """
+    Print the observed and expected frequencies of each rarity and color, and the cards furthest from their expected frequency.
+    """
+    packs = statistics['packs']
+    print(f'Simulated {packs} packs of {expansion} in {statistics["seconds"]:.2f}s ({packs / statistics["seconds"]:.0f} packs/s)')
+
+    for title, groups in (('rarity', RARITY_GROUPS), ('color', COLOR_GROUPS)):
+        observed, expected = statistics[title]
+        print(f'\n{title:<14}{"observed":>12}{"expected":>12}{"difference":>12}')
+        for group, group_observed, group_expected in zip(groups, observed, expected):
+            if group_observed or group_expected:
+                print(f'{group:<14}{group_observed:>12.4f}{group_expected:>12.4f}{difference(group_observed, group_expected):>12}')
+
+    # Deviation of each card count in standard deviations, its number of copies following a Poisson distribution
+    observed, expected = statistics['cards']
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        deviations = numpy.nan_to_num((observed - expected) * packs / numpy.sqrt(expected * packs), nan=0.0, posinf=numpy.inf, neginf=-numpy.inf)
+    print(f'\n{"card":<40}{"observed":>12}{"expected":>12}{"deviation":>12}')
+    for name_id in numpy.argsort(-numpy.abs(deviations), kind='stable')[:top].tolist():
+        print(f'{statistics["names"][name_id][:39]:<40}{observed[name_id]:>12.4f}{expected[name_id]:>12.4f}{deviations[name_id]:>+12.2f}')
+
+def new_simulation(expansion: str, packs: int, jobs: int = 1, top: int = 10) -> None:
+    """
+    Simulate the opening of many packs of the expansion and print how their content compares with the booster weights.
+    """
+    print_simulation(expansion, simulate(expansion, packs, jobs), top)
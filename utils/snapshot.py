@@ -0,0 +1,184 @@
+# Standard Imports
+import json
+import mmap
+import os
+
+# Pypi Imports
+import numpy
+
+# Local Imports
+from global_configuration import DATABASE
+
+# Bit of each color in the colors mask of a card
+COLOR_BITS = {'W': 1, 'U': 2, 'B': 4, 'R': 8, 'G': 16}
+
+# Rarities of the cards, stored as their index, any other rarity being stored as len(RARITIES)
+RARITIES = ('common', 'uncommon', 'rare', 'mythic', 'special', 'bonus')
+
+def color_mask(colors: list[str]) -> int:
+    """
+    Return the colors mask of a card from the list of its colors.
+    """
+    return sum(COLOR_BITS.get(color, 0) for color in colors)
+
+def rarity_code(rarity: str | None) -> int:
+    """
+    Return the index of the rarity of a card in RARITIES.
+    """
+    return RARITIES.index(rarity) if rarity in RARITIES else len(RARITIES)
+
+class Snapshot:
+    """
+    Read-only copy of the database, memory-mapped from a directory written by export_snapshot.
+    Cards are sorted by uuid, so a uuid is found with a binary search in the uuids array.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, 'index.json'), 'r') as f:
+            self.index = json.load(f)
+
+        # Card table
+        self.uuids = numpy.load(os.path.join(path, 'cards_uuid.npy'), mmap_mode='r')
+        self.card_names = numpy.load(os.path.join(path, 'cards_name.npy'), mmap_mode='r')
+        self.colors = numpy.load(os.path.join(path, 'cards_colors.npy'), mmap_mode='r')
+        # Snapshots exported before the rarities were stored have none
+        rarities = os.path.join(path, 'cards_rarity.npy')
+        self.rarities = numpy.load(rarities, mmap_mode='r') if os.path.exists(rarities) else None
+
+        # String table of the card names
+        self.name_offsets = numpy.load(os.path.join(path, 'names_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'names.bin'), 'rb') as f:
+            self.names = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(f.name) else b''
+
+        # Content of every sheet, referred to by ranges in the index
+        self.sheet_cards = numpy.load(os.path.join(path, 'sheet_cards.npy'), mmap_mode='r')
+        self.sheet_weights = numpy.load(os.path.join(path, 'sheet_weights.npy'), mmap_mode='r')
+
+    def name(self, card: int) -> str:
+        """
+        Return the name of the card at the given index of the card table.
+        """
+        name_index = self.card_names[card]
+        return self.names[self.name_offsets[name_index]:self.name_offsets[name_index + 1]].decode()
+
+    def card_index(self, uuids: list[str]) -> numpy.ndarray:
+        """
+        Return the index of each uuid in the card table, or -1 when the card is unknown.
+        """
+        if not len(self.uuids):
+            return numpy.full(len(uuids), -1)
+        keys = numpy.array(uuids, dtype=self.uuids.dtype)
+        indexes = numpy.searchsorted(self.uuids, keys)
+        indexes[indexes == len(self.uuids)] = 0
+        return numpy.where(self.uuids[indexes] == keys, indexes, -1)
+
+    def cards(self, uuids: list[str]) -> list[dict]:
+        """
+        Return the name, colors and rarity of the given cards, shaped like the documents of the cards collection.
+        """
+        cards = []
+        for card_id, card in zip(uuids, self.card_index(uuids).tolist()):
+            if card >= 0:
+                mask = int(self.colors[card])
+                colors = [color for color, bit in COLOR_BITS.items() if mask & bit]
+                code = int(self.rarities[card]) if self.rarities is not None else len(RARITIES)
+                cards.append({'uuid': card_id, 'name': self.name(card), 'colors': colors, 'rarity': RARITIES[code] if code < len(RARITIES) else None})
+        return cards
+
+    def legal_sets(self) -> list[str]:
+        """
+        Return the code of every set playable in limited.
+        """
+        return [set_data['code'] for set_data in self.index['sets'] if set_data['legal']]
+
+    def document(self, collection: str, code: str) -> dict | None:
+        """
+        Rebuild the booster or prerelease document of the given set.
+        """
+        definition = self.index[collection].get(code)
+        if definition is None:
+            return None
+        document = dict(definition)
+        document['sheets'] = {}
+        for slot, sheet in definition['sheets'].items():
+            cards = self.sheet_cards[sheet['start']:sheet['stop']]
+            weights = self.sheet_weights[sheet['start']:sheet['stop']].tolist()
+            uuids = [card_id.decode() for card_id in self.uuids[cards].tolist()]
+            properties = {key: value for key, value in sheet.items() if key not in ('start', 'stop')}
+            document['sheets'][slot] = dict(properties, cards=dict(zip(uuids, weights)))
+        return document
+
+ACTIVE: Snapshot | None = None
+
+def use(path: str | None) -> None:
+    """
+    Read the generation data from the snapshot at the given path instead of the database.
+    """
+    global ACTIVE
+    ACTIVE = Snapshot(path) if path else None
+
+def active() -> Snapshot | None:
+    """
+    Return the snapshot used for generation, if any.
+    """
+    return ACTIVE
+
+def export_snapshot(path: str) -> None:
+    """
+    Write the sets, boosters, prerelease definitions and card names of the database to the given directory.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    # Build the card table, sorted by uuid
+    print('-   Exporting cards')
+    cards = sorted(DATABASE['cards'].find({}, {'_id': 0, 'uuid': 1, 'name': 1, 'colors': 1, 'rarity': 1}), key=lambda card: card['uuid'])
+    uuids = [card['uuid'] for card in cards]
+    uuid_index = {card_id: index for index, card_id in enumerate(uuids)}
+
+    # Intern the names in a single string table
+    name_index: dict[str, int] = {}
+    name_offsets = [0]
+    with open(os.path.join(path, 'names.bin'), 'wb') as f:
+        for card in cards:
+            if card['name'] not in name_index:
+                name_index[card['name']] = len(name_index)
+                encoded = card['name'].encode()
+                f.write(encoded)
+                name_offsets.append(name_offsets[-1] + len(encoded))
+    numpy.save(os.path.join(path, 'names_offsets.npy'), numpy.array(name_offsets, dtype=numpy.int64))
+    numpy.save(os.path.join(path, 'cards_uuid.npy'), numpy.array(uuids, dtype='S36'))
+    numpy.save(os.path.join(path, 'cards_name.npy'), numpy.array([name_index[card['name']] for card in cards], dtype=numpy.int32))
+    numpy.save(os.path.join(path, 'cards_colors.npy'), numpy.array([color_mask(card.get('colors', [])) for card in cards], dtype=numpy.uint8))
+    numpy.save(os.path.join(path, 'cards_rarity.npy'), numpy.array([rarity_code(card.get('rarity')) for card in cards], dtype=numpy.uint8))
+
+    # Store the content of every sheet in two flat arrays
+    sheet_cards: list[int] = []
+    sheet_weights: list[int] = []
+    index: dict = {'sets': DATABASE['sets'].find({}, {'_id': 0, 'code': 1, 'legal': 1}).to_list(), 'boosters': {}, 'prerelease': {}}
+    for collection in ('boosters', 'prerelease'):
+        print(f'-   Exporting {collection}')
+        for document in DATABASE[collection].find({}, {'_id': 0}):
+            sheets = {}
+            samplers = document.get('samplers') or {}
+            color_buckets = document.get('color_buckets') or {}
+            for slot, sheet in document['sheets'].items():
+                start = len(sheet_cards)
+                for card_id, weight in sheet['cards'].items():
+                    if card_id in uuid_index:
+                        sheet_cards.append(uuid_index[card_id])
+                        sheet_weights.append(weight)
+                properties = {key: value for key, value in sheet.items() if key != 'cards'}
+                missing = len(sheet['cards']) - (len(sheet_cards) - start)
+                if missing:
+                    # The sheet is exported without the unknown cards, so the data computed from its full content is dropped
+                    print(f'-   Warning: {missing} card(s) of the {slot} sheet of {document["code"]} ({collection}) are not in the cards collection and are left out')
+                    properties['totalWeight'] = sum(sheet_weights[start:])
+                    samplers.get('sheets', {}).pop(slot, None)
+                    color_buckets.pop(slot, None)
+                sheets[slot] = dict(properties, start=start, stop=len(sheet_cards))
+            index[collection][document['code']] = dict(document, sheets=sheets)
+    numpy.save(os.path.join(path, 'sheet_cards.npy'), numpy.array(sheet_cards, dtype=numpy.int32))
+    numpy.save(os.path.join(path, 'sheet_weights.npy'), numpy.array(sheet_weights, dtype=numpy.int64))
+
+    with open(os.path.join(path, 'index.json'), 'w') as f:
+        json.dump(index, f)